@@ -10,11 +10,14 @@ Uses a meta-learner to optimally combine base model predictions.
 
 import json
 import logging
+import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import torch
+import torch.distributed as dist
 from sklearn.linear_model import Ridge
 from sklearn.model_selection import KFold
 import joblib
@@ -42,6 +45,7 @@ class EnsembleConfig:
         # Ensemble strategy
         strategy: str = "stacking",  # "stacking", "weighted_avg", "dynamic"
         n_folds: int = 5,  # For stacking cross-validation
+        n_jobs: int = 1,  # Folds trained concurrently (-1 = all cores)
         # Weights for weighted average (if strategy="weighted_avg")
         tft_weight: float = 0.5,
         lgb_weight: float = 0.5,
@@ -53,6 +57,7 @@ class EnsembleConfig:
         self.meta_learner_alpha = meta_learner_alpha
         self.strategy = strategy
         self.n_folds = n_folds
+        self.n_jobs = n_jobs
         self.tft_weight = tft_weight
         self.lgb_weight = lgb_weight
         self.confidence_method = confidence_method
@@ -64,6 +69,7 @@ class EnsembleConfig:
             "meta_learner_alpha": self.meta_learner_alpha,
             "strategy": self.strategy,
             "n_folds": self.n_folds,
+            "n_jobs": self.n_jobs,
             "tft_weight": self.tft_weight,
             "lgb_weight": self.lgb_weight,
             "confidence_method": self.confidence_method,
@@ -77,12 +83,63 @@ class EnsembleConfig:
             meta_learner_alpha=config_dict.get("meta_learner_alpha", 1.0),
             strategy=config_dict.get("strategy", "stacking"),
             n_folds=config_dict.get("n_folds", 5),
+            n_jobs=config_dict.get("n_jobs", 1),
             tft_weight=config_dict.get("tft_weight", 0.5),
             lgb_weight=config_dict.get("lgb_weight", 0.5),
             confidence_method=config_dict.get("confidence_method", "min"),
         )
 
 
+def _fit_fold(
+    fold: int,
+    n_folds: int,
+    tft_config: TFTConfig,
+    lgb_config: LightGBMConfig,
+    X_train_fold: pd.DataFrame,
+    y_train_fold: pd.Series,
+    X_val_fold: pd.DataFrame,
+    num_threads: Optional[int] = None,
+) -> Dict[str, Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]]:
+    """
+    Fit both base models on one CV fold.
+
+    Module-level so joblib can run folds in worker processes. num_threads,
+    when given, caps torch's intra-op threads for the fold's TFT fit.
+
+    Returns:
+        Dict with "tft" and "lgb" (prediction, lower, upper) arrays for the
+        fold's validation rows; "tft" is None if TFT training failed
+    """
+    logger.info(f"Training fold {fold + 1}/{n_folds}")
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    result: Dict[str, Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {"tft": None}
+
+    # Train TFT on fold
+    tft_fold = TemporalFusionTransformerModel(config=tft_config)
+    try:
+        tft_fold.fit(X_train_fold, y_train_fold)
+        tft_preds = tft_fold.predict(X_val_fold)
+        result["tft"] = (
+            tft_preds["predicted_occupancy"].values,
+            tft_preds["lower_bound"].values,
+            tft_preds["upper_bound"].values,
+        )
+    except Exception as e:
+        logger.warning(f"TFT training failed on fold {fold}: {e}")
+
+    # Train LightGBM on fold
+    lgb_fold = LightGBMModel(config=lgb_config)
+    lgb_fold.fit(X_train_fold, y_train_fold)
+    lgb_preds = lgb_fold.predict(X_val_fold)
+    result["lgb"] = (
+        lgb_preds["predicted_occupancy"].values,
+        lgb_preds["lower_bound"].values,
+        lgb_preds["upper_bound"].values,
+    )
+    return result
+
+
 class EnsembleModel(BaseModel):
     """
     Stacking ensemble combining TFT and LightGBM models.
@@ -152,35 +209,49 @@ class EnsembleModel(BaseModel):
         lgb_lower = np.zeros(n_samples)
         lgb_upper = np.zeros(n_samples)
 
-        for fold, (train_idx, val_idx) in enumerate(kf.split(X)):
-            logger.info(f"Training fold {fold + 1}/{self.ensemble_config.n_folds}")
-
-            X_train_fold = X.iloc[train_idx]
-            y_train_fold = y.iloc[train_idx]
-            X_val_fold = X.iloc[val_idx]
-
-            # Train TFT on fold
-            tft_fold = TemporalFusionTransformerModel(
-                config=self.ensemble_config.tft_config
+        # Folds are independent fits, so they run concurrently when n_jobs > 1;
+        # LightGBM and torch threads are split between the concurrent folds so
+        # the cores are not oversubscribed
+        n_folds = self.ensemble_config.n_folds
+        n_jobs = min(joblib.effective_n_jobs(self.ensemble_config.n_jobs), n_folds)
+        lgb_config = self.ensemble_config.lgb_config
+
+        # Fold TFTs never join the torchrun process group: loky workers inherit
+        # RANK/WORLD_SIZE and would register as duplicate ranks
+        tft_config = TFTConfig.from_dict({
+            **self.ensemble_config.tft_config.to_dict(),
+            "strategy": "single",
+        })
+        fold_threads = None
+        if n_jobs > 1:
+            fold_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+            lgb_config = LightGBMConfig.from_dict({
+                **lgb_config.to_dict(),
+                "num_threads": fold_threads,
+            })
+
+        splits = list(kf.split(X))
+        results = joblib.Parallel(n_jobs=n_jobs, backend="loky")(
+            joblib.delayed(_fit_fold)(
+                fold,
+                n_folds,
+                tft_config,
+                lgb_config,
+                X.iloc[train_idx],
+                y.iloc[train_idx],
+                X.iloc[val_idx],
+                fold_threads,
             )
-            try:
-                tft_fold.fit(X_train_fold, y_train_fold)
-                tft_preds = tft_fold.predict(X_val_fold)
-                tft_oof[val_idx] = tft_preds["predicted_occupancy"].values
-                tft_lower[val_idx] = tft_preds["lower_bound"].values
-                tft_upper[val_idx] = tft_preds["upper_bound"].values
-            except Exception as e:
-                logger.warning(f"TFT training failed on fold {fold}: {e}")
+            for fold, (train_idx, val_idx) in enumerate(splits)
+        )
+
+        for (_, val_idx), result in zip(splits, results):
+            if result["tft"] is not None:
+                tft_oof[val_idx], tft_lower[val_idx], tft_upper[val_idx] = result["tft"]
+            else:
                 # Use LightGBM predictions as fallback
                 tft_oof[val_idx] = np.nan
-
-            # Train LightGBM on fold
-            lgb_fold = LightGBMModel(config=self.ensemble_config.lgb_config)
-            lgb_fold.fit(X_train_fold, y_train_fold)
-            lgb_preds = lgb_fold.predict(X_val_fold)
-            lgb_oof[val_idx] = lgb_preds["predicted_occupancy"].values
-            lgb_lower[val_idx] = lgb_preds["lower_bound"].values
-            lgb_upper[val_idx] = lgb_preds["upper_bound"].values
+            lgb_oof[val_idx], lgb_lower[val_idx], lgb_upper[val_idx] = result["lgb"]
 
         # Handle any NaN values from TFT failures
         if np.any(np.isnan(tft_oof)):
@@ -221,6 +292,19 @@ class EnsembleModel(BaseModel):
         """
         logger.info(f"Training ensemble with strategy: {self.ensemble_config.strategy}")
 
+        # Under torchrun every rank joins the data-parallel TFT fit; the CV
+        # folds, meta-learners and LightGBM only run on rank 0, which is the
+        # rank that evaluates and saves the ensemble
+        logger.info("Training TFT on full data...")
+        try:
+            self._tft_model.fit(X, y, validation_data=validation_data)
+        except Exception as e:
+            logger.warning(f"TFT training failed: {e}. Using LightGBM only.")
+
+        if dist.is_available() and dist.is_initialized() and dist.get_rank() != 0:
+            logger.info("Skipping stacking and LightGBM on non-zero rank")
+            return self
+
         if self.ensemble_config.strategy == "stacking":
             # Generate stacking features
             meta_features, meta_lower, meta_upper, targets = self._get_stacking_features(X, y)
@@ -241,13 +325,7 @@ class EnsembleModel(BaseModel):
                 f"LGB={self._meta_learner.coef_[1]:.3f}"
             )
 
-        # Train base models on full data for inference
-        logger.info("Training TFT on full data...")
-        try:
-            self._tft_model.fit(X, y, validation_data=validation_data)
-        except Exception as e:
-            logger.warning(f"TFT training failed: {e}. Using LightGBM only.")
-
+        # Train LightGBM on full data for inference
         logger.info("Training LightGBM on full data...")
         self._lgb_model.fit(X, y, validation_data=validation_data)
 
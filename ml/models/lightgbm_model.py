@@ -23,9 +23,25 @@ from sklearn.model_selection import cross_val_score
 
 from ml.models.base_model import BaseModel, PredictionOutput
 
+# LightGBM >= 4.2 reads pyarrow Tables column by column, without first
+# materializing a dense float64 copy of a mixed-dtype DataFrame
+try:
+    import pyarrow as pa
+    HAS_ARROW_INPUT = tuple(map(int, lgb.__version__.split(".")[:2])) >= (4, 2)
+except ImportError:
+    HAS_ARROW_INPUT = False
+
 logger = logging.getLogger(__name__)
 
 
+def _to_lgb_input(X: pd.DataFrame):
+    """Hand a feature frame to LightGBM as a pyarrow Table when supported."""
+    # LightGBM rejects Arrow dictionary columns, so categoricals stay in pandas
+    if not HAS_ARROW_INPUT or any(isinstance(dtype, pd.CategoricalDtype) for dtype in X.dtypes):
+        return X
+    return pa.Table.from_pandas(X, preserve_index=False)
+
+
 class LightGBMConfig:
     """Configuration for LightGBM model."""
 
@@ -205,7 +221,7 @@ class LightGBMModel(BaseModel):
             raise ValueError("No valid features found in input DataFrame")
 
         self._feature_columns = available_features
-        X_train = X[available_features].copy()
+        X_train = _to_lgb_input(X[available_features])
 
         # Identify categorical columns present in data
         cat_features = [col for col in self.CATEGORICAL_FEATURES if col in available_features]
@@ -215,7 +231,7 @@ class LightGBMModel(BaseModel):
         eval_set = None
         if validation_data is not None:
             X_val, y_val = validation_data
-            X_val = X_val[available_features].copy()
+            X_val = _to_lgb_input(X_val[available_features])
             eval_set = [(X_val, y_val)]
             callbacks.append(
                 lgb.early_stopping(
@@ -265,7 +281,7 @@ class LightGBMModel(BaseModel):
         if not self._is_fitted:
             raise RuntimeError("Model must be fitted before prediction")
 
-        X_pred = X[self._feature_columns].copy()
+        X_pred = _to_lgb_input(X[self._feature_columns])
 
         # Get predictions from each quantile model
         predictions = {}
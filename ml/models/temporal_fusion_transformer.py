@@ -10,18 +10,26 @@ Reference: Lim et al., "Temporal Fusion Transformers for Interpretable
 Multi-horizon Time Series Forecasting" (2021)
 """
 
+import inspect
 import json
 import logging
+import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import torch
+import torch.distributed as dist
 from torch import nn
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data.distributed import DistributedSampler
 
 from ml.models.base_model import BaseModel, PredictionOutput
 
+# torch < 2.1 has no mmap option for torch.load
+_TORCH_LOAD_MMAP = "mmap" in inspect.signature(torch.load).parameters
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,6 +49,8 @@ class TFTConfig:
         max_epochs: int = 100,
         early_stopping_patience: int = 10,
         quantiles: List[float] = None,
+        strategy: str = "auto",  # "auto"/"ddp" use DDP under torchrun, "single" never does
+        tf32: bool = False,  # Process-wide: lowers float32 matmul precision for every model
     ):
         self.hidden_size = hidden_size
         self.lstm_layers = lstm_layers
@@ -53,6 +63,8 @@ class TFTConfig:
         self.max_epochs = max_epochs
         self.early_stopping_patience = early_stopping_patience
         self.quantiles = quantiles or [0.1, 0.5, 0.9]
+        self.strategy = strategy
+        self.tf32 = tf32
 
     def to_dict(self) -> Dict[str, Any]:
         return self.__dict__.copy()
@@ -62,6 +74,38 @@ class TFTConfig:
         return cls(**config_dict)
 
 
+def init_distributed() -> bool:
+    """
+    Join the torchrun process group, if this process was launched as one rank
+    of several (WORLD_SIZE > 1).
+
+    Returns:
+        True when running distributed; the group is initialized at most once
+    """
+    if int(os.environ.get("WORLD_SIZE", 1)) <= 1 or not dist.is_available():
+        return False
+
+    if not dist.is_initialized():
+        if torch.cuda.is_available():
+            torch.cuda.set_device(int(os.environ.get("LOCAL_RANK", 0)))
+        dist.init_process_group(backend="nccl" if torch.cuda.is_available() else "gloo")
+    return True
+
+
+def broadcast_object(obj: Any) -> Any:
+    """
+    Send a picklable object from rank 0 to every rank and return it.
+
+    Uses a gloo group, so large payloads stay in host memory even when the
+    default group runs on NCCL.
+    """
+    group = dist.new_group(backend="gloo")
+    payload = [obj]
+    dist.broadcast_object_list(payload, src=0, group=group)
+    dist.destroy_process_group(group)
+    return payload[0]
+
+
 class GatedLinearUnit(nn.Module):
     """Gated Linear Unit for feature selection."""
 
@@ -138,8 +182,16 @@ class TemporalSelfAttention(nn.Module):
         self,
         x: torch.Tensor,
         mask: Optional[torch.Tensor] = None,
-    ) -> Tuple[torch.Tensor, torch.Tensor]:
-        attn_out, attn_weights = self.attention(x, x, x, attn_mask=mask)
+        need_weights: bool = False,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        # Materializing weights forces the unfused math path, so only do it on
+        # request; they are per head: (batch, num_heads, seq_len, seq_len)
+        attn_out, attn_weights = self.attention(
+            x, x, x,
+            attn_mask=mask,
+            need_weights=need_weights,
+            average_attn_weights=False,
+        )
         return self.layer_norm(x + self.dropout(attn_out)), attn_weights
 
 
@@ -213,7 +265,8 @@ class TFTModel(nn.Module):
         categorical_encoder: torch.Tensor,
         continuous_decoder: torch.Tensor,
         categorical_decoder: torch.Tensor,
-    ) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
+        return_attention: bool = False,
+    ) -> Tuple[torch.Tensor, Dict[str, Optional[torch.Tensor]]]:
         """
         Forward pass through TFT.
 
@@ -222,10 +275,15 @@ class TFTModel(nn.Module):
             categorical_encoder: (batch, encoder_len, num_categorical) as indices
             continuous_decoder: (batch, decoder_len, num_continuous)
             categorical_decoder: (batch, decoder_len, num_categorical) as indices
+            return_attention: Whether to compute per-head attention weights
+                (ignored in training mode)
 
         Returns:
             predictions: (batch, decoder_len, num_quantiles)
-            interpretability: Dictionary of attention weights
+            interpretability: Dictionary of variable selection and attention
+                weights; attention weights are None unless requested, else
+                (batch, attention_heads, encoder_len + decoder_len,
+                encoder_len + decoder_len)
         """
         batch_size = continuous_encoder.shape[0]
 
@@ -265,7 +323,9 @@ class TFTModel(nn.Module):
         combined = torch.cat([encoder_output, decoder_output], dim=1)
 
         # Temporal self-attention
-        attended, attn_weights = self.temporal_attention(combined)
+        attended, attn_weights = self.temporal_attention(
+            combined, need_weights=return_attention and not self.training
+        )
 
         # Get decoder portion with gated residual
         decoder_attended = attended[:, -self.config.decoder_length:, :]
@@ -347,6 +407,7 @@ class TemporalFusionTransformerModel(BaseModel):
         self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self._scaler_params: Optional[Dict[str, Any]] = None
         self._feature_columns = self.CONTINUOUS_FEATURES + self.CATEGORICAL_FEATURES
+        self._last_attention: Optional[torch.Tensor] = None
 
     def _build_model(self) -> TFTModel:
         """Initialize the TFT neural network."""
@@ -356,6 +417,22 @@ class TemporalFusionTransformerModel(BaseModel):
             num_categorical=len(self.CATEGORICAL_FEATURES),
         ).to(self._device)
 
+    def _setup_distributed(self) -> bool:
+        """
+        Join the torchrun process group when data-parallel training applies.
+
+        Returns:
+            True when this process is one of several DDP ranks (WORLD_SIZE > 1
+            and strategy "auto" or "ddp"); each rank then trains a replica on
+            its own shard of the batches and gradients are all-reduced.
+        """
+        if self.tft_config.strategy not in ("auto", "ddp") or not init_distributed():
+            return False
+
+        if torch.cuda.is_available():
+            self._device = torch.device("cuda", int(os.environ.get("LOCAL_RANK", 0)))
+        return True
+
     def _prepare_sequences(
         self,
         df: pd.DataFrame,
@@ -377,7 +454,8 @@ class TemporalFusionTransformerModel(BaseModel):
 
         # Extract feature matrices
         continuous = df[self.CONTINUOUS_FEATURES].values
-        categorical = df[self.CATEGORICAL_FEATURES].values.astype(np.int64)
+        # Category indices are bounded by the embedding size (100), so int32 suffices
+        categorical = df[self.CATEGORICAL_FEATURES].values.astype(np.int32)
         target = df[target_col].values
 
         # Create sequences
@@ -395,9 +473,9 @@ class TemporalFusionTransformerModel(BaseModel):
 
         return (
             torch.tensor(np.array(cont_enc), dtype=torch.float32),
-            torch.tensor(np.array(cat_enc), dtype=torch.long),
+            torch.tensor(np.array(cat_enc), dtype=torch.int32),
             torch.tensor(np.array(cont_dec), dtype=torch.float32),
-            torch.tensor(np.array(cat_dec), dtype=torch.long),
+            torch.tensor(np.array(cat_dec), dtype=torch.int32),
             torch.tensor(np.array(targets), dtype=torch.float32),
         )
 
@@ -422,6 +500,10 @@ class TemporalFusionTransformerModel(BaseModel):
         """
         logger.info(f"Training TFT with config: {self.tft_config.to_dict()}")
 
+        if self.tft_config.tf32:
+            # Allow TF32 tensor cores for float32 matmuls on Ampere+ GPUs
+            torch.set_float32_matmul_precision("high")
+
         # Validate and prepare data
         self._validate_input(X)
         train_df = X.copy()
@@ -438,21 +520,31 @@ class TemporalFusionTransformerModel(BaseModel):
         # Prepare sequences
         cont_enc, cat_enc, cont_dec, cat_dec, targets = self._prepare_sequences(train_df)
 
-        # Create data loader
+        # Create data loader (sharded across ranks under DDP)
+        distributed = self._setup_distributed()
         dataset = torch.utils.data.TensorDataset(
             cont_enc, cat_enc, cont_dec, cat_dec, targets
         )
+        sampler = DistributedSampler(dataset) if distributed else None
         loader = torch.utils.data.DataLoader(
             dataset,
             batch_size=self.tft_config.batch_size,
-            shuffle=True,
+            shuffle=sampler is None,
+            sampler=sampler,
         )
 
         # Initialize model and training components
         self._model = self._build_model()
+        train_model = self._model
+        if distributed:
+            train_model = DistributedDataParallel(
+                self._model,
+                device_ids=[self._device.index] if self._device.type == "cuda" else None,
+            )
         optimizer = torch.optim.Adam(
             self._model.parameters(),
             lr=self.tft_config.learning_rate,
+            fused=self._device.type == "cuda",
         )
         scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
             optimizer, mode="min", factor=0.5, patience=5
@@ -471,7 +563,10 @@ class TemporalFusionTransformerModel(BaseModel):
             val_tensors = self._prepare_sequences(val_df)
             val_dataset = torch.utils.data.TensorDataset(*val_tensors)
             val_loader = torch.utils.data.DataLoader(
-                val_dataset, batch_size=self.tft_config.batch_size
+                val_dataset,
+                batch_size=self.tft_config.batch_size,
+                # Under DDP each rank scores its own shard of the windows
+                sampler=DistributedSampler(val_dataset, shuffle=False) if distributed else None,
             )
 
         # Training loop
@@ -479,6 +574,8 @@ class TemporalFusionTransformerModel(BaseModel):
         patience_counter = 0
 
         for epoch in range(self.tft_config.max_epochs):
+            if sampler is not None:
+                sampler.set_epoch(epoch)
             self._model.train()
             train_loss = 0.0
 
@@ -487,8 +584,8 @@ class TemporalFusionTransformerModel(BaseModel):
                     t.to(self._device) for t in batch
                 ]
 
-                optimizer.zero_grad()
-                predictions, _ = self._model(
+                optimizer.zero_grad(set_to_none=True)
+                predictions, _ = train_model(
                     cont_enc_b, cat_enc_b, cont_dec_b, cat_dec_b
                 )
                 loss = criterion(predictions, target_b)
@@ -514,7 +611,14 @@ class TemporalFusionTransformerModel(BaseModel):
                         )
                         val_loss += criterion(predictions, target_b).item()
 
-                avg_val_loss = val_loss / len(val_loader)
+                if distributed:
+                    # Combine the shards, so the LR schedule and early stopping
+                    # are identical on every rank
+                    totals = torch.tensor([val_loss, len(val_loader)], device=self._device)
+                    dist.all_reduce(totals)
+                    avg_val_loss = (totals[0] / totals[1]).item()
+                else:
+                    avg_val_loss = val_loss / len(val_loader)
                 scheduler.step(avg_val_loss)
 
                 if avg_val_loss < best_val_loss:
@@ -555,51 +659,25 @@ class TemporalFusionTransformerModel(BaseModel):
         Returns:
             DataFrame with predictions
         """
-        if not self._is_fitted:
-            raise RuntimeError("Model must be fitted before prediction")
-
-        self._validate_input(X)
-        self._model.eval()
-
-        # Normalize features
-        df = X.copy()
-        for col in self.CONTINUOUS_FEATURES:
-            params = self._scaler_params[col]
-            df[col] = (df[col] - params["mean"]) / params["std"]
-
-        # Add dummy target for sequence creation
-        df["occupancy"] = 0
-
-        # Prepare sequences
-        cont_enc, cat_enc, cont_dec, cat_dec, _ = self._prepare_sequences(df)
+        inputs = self._inference_inputs(X)
 
         # Run inference
         with torch.no_grad():
-            cont_enc = cont_enc.to(self._device)
-            cat_enc = cat_enc.to(self._device)
-            cont_dec = cont_dec.to(self._device)
-            cat_dec = cat_dec.to(self._device)
-
-            predictions, interpretability = self._model(
-                cont_enc, cat_enc, cont_dec, cat_dec
-            )
-            predictions = predictions.cpu().numpy()
+            predictions, interpretability = self._model(*inputs)
+            # Clip all quantiles to the valid range in a single device op
+            predictions = predictions.clamp_(0.0, 100.0).cpu().numpy()
 
         # Extract quantile predictions
-        q_low = predictions[:, :, 0]  # 10th percentile
-        q_mid = predictions[:, :, 1]  # 50th percentile (median)
-        q_high = predictions[:, :, 2]  # 90th percentile
-
-        # Flatten and clip predictions
-        q_low = self._clip_predictions(q_low.flatten())
-        q_mid = self._clip_predictions(q_mid.flatten())
-        q_high = self._clip_predictions(q_high.flatten())
+        q_low = predictions[:, :, 0].ravel()  # 10th percentile
+        q_mid = predictions[:, :, 1].ravel()  # 50th percentile (median)
+        q_high = predictions[:, :, 2].ravel()  # 90th percentile
 
         # Calculate confidence from prediction interval width
-        interval_width = q_high - q_low
         max_width = 100.0  # Maximum possible interval
-        confidence = 1.0 - (interval_width / max_width)
-        confidence = np.clip(confidence, 0, 1)
+        confidence = np.subtract(q_high, q_low)
+        confidence /= -max_width
+        confidence += 1.0
+        np.clip(confidence, 0, 1, out=confidence)
 
         result = pd.DataFrame({
             "predicted_occupancy": q_mid,
@@ -613,6 +691,57 @@ class TemporalFusionTransformerModel(BaseModel):
 
         return result
 
+    def explain(self, X: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Compute interpretability weights for input features.
+
+        Attention weights are materialized only here, so predict keeps the
+        fused attention kernels. The weights are also kept for
+        get_attention_weights.
+
+        Args:
+            X: Feature DataFrame (same layout as for predict)
+
+        Returns:
+            Dictionary with:
+                attention_weights: per-head temporal self-attention,
+                    (windows, attention_heads, encoder_len + decoder_len,
+                    encoder_len + decoder_len)
+                encoder_variable_weights: (windows, encoder_len, num_inputs)
+                decoder_variable_weights: (windows, decoder_len, num_inputs)
+        """
+        inputs = self._inference_inputs(X)
+
+        with torch.no_grad():
+            _, interpretability = self._model(*inputs, return_attention=True)
+
+        self._last_attention = interpretability["attention_weights"].cpu()
+        return {
+            name: weights.float().cpu().numpy()
+            for name, weights in interpretability.items()
+        }
+
+    def _inference_inputs(self, X: pd.DataFrame) -> Tuple[torch.Tensor, ...]:
+        """Normalize features and build encoder/decoder tensors on the model device."""
+        if not self._is_fitted:
+            raise RuntimeError("Model must be fitted before prediction")
+
+        self._validate_input(X)
+        self._model.eval()
+
+        # Normalize features
+        df = X.copy()
+        for col in self.CONTINUOUS_FEATURES:
+            params = self._scaler_params[col]
+            df[col] = (df[col] - params["mean"]) / params["std"]
+
+        # Add dummy target for sequence creation
+        df["occupancy"] = 0
+
+        # Prepare sequences
+        cont_enc, cat_enc, cont_dec, cat_dec, _ = self._prepare_sequences(df)
+        return tuple(t.to(self._device) for t in (cont_enc, cat_enc, cont_dec, cat_dec))
+
     def predict_single(
         self,
         features: Dict[str, Any],
@@ -663,8 +792,12 @@ class TemporalFusionTransformerModel(BaseModel):
         path = Path(path)
         path.mkdir(parents=True, exist_ok=True)
 
-        # Save model weights
-        torch.save(self._model.state_dict(), path / "model.pt")
+        # Save model weights in bf16 to halve checkpoint size
+        bf16_state = {
+            k: v.to(torch.bfloat16) if v.is_floating_point() else v
+            for k, v in self._model.state_dict().items()
+        }
+        torch.save(bf16_state, path / "model.pt")
 
         # Save config and scaler params
         metadata = {
@@ -690,9 +823,11 @@ class TemporalFusionTransformerModel(BaseModel):
         self.model_version = metadata["model_version"]
         self.config = metadata["config"]
 
-        # Load model weights
+        # Load model weights (memory-mapped; load_state_dict casts bf16 back to fp32)
         self._model = self._build_model()
-        self._model.load_state_dict(torch.load(path / "model.pt", map_location=self._device))
+        load_kwargs = {"mmap": True} if _TORCH_LOAD_MMAP else {}
+        state_dict = torch.load(path / "model.pt", map_location=self._device, **load_kwargs)
+        self._model.load_state_dict(state_dict)
         self._model.eval()
         self._is_fitted = True
 
@@ -700,6 +835,11 @@ class TemporalFusionTransformerModel(BaseModel):
         return self
 
     def get_attention_weights(self) -> Optional[torch.Tensor]:
-        """Get attention weights from last forward pass for interpretability."""
-        # This would be implemented with proper caching in production
-        return None
+        """
+        Get per-head attention weights from the last explain() call.
+
+        Returns:
+            (windows, attention_heads, encoder_len + decoder_len,
+            encoder_len + decoder_len) tensor, or None before explain() runs
+        """
+        return self._last_attention
@@ -15,14 +15,15 @@ Requirements:
 """
 
 import argparse
+import copy
+import functools
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
 try:
@@ -39,6 +40,24 @@ except ImportError:
     HAS_SUPABASE = False
     print("Warning: Supabase client not installed. Using local data only.")
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 # ============================================================
 # FEATURE ENGINEERING
 # ============================================================
@@ -58,175 +77,197 @@ FEATURE_NAMES = [
     'nearby_lots_avg_occupancy', 'campus_wide_occupancy',
 ]
 
+# Cyclical encodings only take 24 (hour) and 7 (day of week) distinct values
+_HOUR_SIN = np.sin(2 * np.pi * np.arange(24) / 24)
+_HOUR_COS = np.cos(2 * np.pi * np.arange(24) / 24)
+_DOW_SIN = np.sin(2 * np.pi * np.arange(7) / 7)
+_DOW_COS = np.cos(2 * np.pi * np.arange(7) / 7)
 
-def extract_time_features(timestamp: datetime) -> Dict:
-    """Extract time-based features from timestamp."""
-    hour = timestamp.hour
-    minute = timestamp.minute
-    day_of_week = timestamp.weekday()
-    day_of_month = timestamp.day
-    month = timestamp.month
-
-    # Week of year
-    week_of_year = timestamp.isocalendar()[1]
 
-    # Cyclical encoding
-    hour_sin = np.sin(2 * np.pi * hour / 24)
-    hour_cos = np.cos(2 * np.pi * hour / 24)
-    day_of_week_sin = np.sin(2 * np.pi * day_of_week / 7)
-    day_of_week_cos = np.cos(2 * np.pi * day_of_week / 7)
+def extract_time_features(timestamps: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+    """Extract time-based features from timestamps (vectorized over the index)."""
+    timestamps = pd.DatetimeIndex(timestamps)
+    hour = timestamps.hour.to_numpy(np.int8)
+    day_of_week = timestamps.dayofweek.to_numpy(np.int8)
 
     return {
         'hour': hour,
-        'minute': minute,
+        'minute': timestamps.minute.to_numpy(np.int8),
         'day_of_week': day_of_week,
-        'day_of_month': day_of_month,
-        'week_of_year': week_of_year,
-        'month': month,
-        'is_weekend': int(day_of_week >= 5),
-        'hour_sin': hour_sin,
-        'hour_cos': hour_cos,
-        'day_of_week_sin': day_of_week_sin,
-        'day_of_week_cos': day_of_week_cos,
+        'day_of_month': timestamps.day.to_numpy(np.int8),
+        'week_of_year': timestamps.isocalendar().week.to_numpy(np.int8),
+        'month': timestamps.month.to_numpy(np.int8),
+        'is_weekend': (day_of_week >= 5).astype(np.int8),
+        # Cyclical encoding
+        'hour_sin': _HOUR_SIN[hour],
+        'hour_cos': _HOUR_COS[hour],
+        'day_of_week_sin': _DOW_SIN[day_of_week],
+        'day_of_week_cos': _DOW_COS[day_of_week],
     }
 
 
-def generate_synthetic_data(n_samples: int = 10000) -> pd.DataFrame:
-    """Generate synthetic training data based on typical parking patterns."""
-    np.random.seed(42)
-
-    data = []
-    start_date = datetime(2024, 8, 26)  # Fall semester start
-
-    for i in range(n_samples):
-        # Random timestamp within semester
-        days_offset = np.random.randint(0, 120)
-        hours_offset = np.random.randint(6, 22)  # 6am - 10pm
-        timestamp = start_date + timedelta(days=days_offset, hours=hours_offset)
-
-        # Time features
-        features = extract_time_features(timestamp)
-
-        # Academic features
-        features['days_into_semester'] = days_offset
-        features['is_class_day'] = int(features['day_of_week'] < 5)
-        features['is_finals_week'] = int(days_offset > 105 and days_offset <= 112)
-        features['is_first_week'] = int(days_offset < 7)
-        features['is_spring_break'] = 0
-        features['is_summer_session'] = 0
-
-        # Event features (random with typical probabilities)
-        is_saturday = features['day_of_week'] == 5
-        features['has_football_game'] = int(is_saturday and np.random.random() < 0.15)
-        features['has_basketball_game'] = int(np.random.random() < 0.05)
-        features['has_concert'] = int(np.random.random() < 0.02)
-        features['has_graduation'] = 0
-        features['has_special_event'] = int(any([
-            features['has_football_game'],
-            features['has_basketball_game'],
-            features['has_concert']
-        ]))
-
-        # Event impact
-        event_impact = 0
-        if features['has_football_game']:
-            event_impact = 1.0
-        elif features['has_basketball_game']:
-            event_impact = 0.7
-        elif features['has_concert']:
-            event_impact = 0.6
-        features['event_impact_score'] = event_impact
-        features['hours_until_event'] = -1 if not features['has_special_event'] else np.random.randint(0, 6)
-
-        # Weather features (seasonal with noise)
-        month = timestamp.month
-        if month in [12, 1, 2]:  # Winter
-            features['temperature'] = np.random.normal(45, 10)
-        elif month in [6, 7, 8]:  # Summer
-            features['temperature'] = np.random.normal(90, 8)
-        else:  # Spring/Fall
-            features['temperature'] = np.random.normal(70, 12)
-
-        features['precipitation_probability'] = np.random.beta(2, 8)
-        features['is_raining'] = int(features['precipitation_probability'] > 0.6)
-        features['wind_speed'] = np.abs(np.random.normal(12, 8))  # Lubbock is windy!
-
-        weather_impact = 0
-        if features['is_raining']:
-            weather_impact += 0.4
-        if features['temperature'] < 40 or features['temperature'] > 95:
-            weather_impact += 0.3
-        if features['wind_speed'] > 25:
-            weather_impact += 0.2
-        features['weather_impact_score'] = min(weather_impact, 1.0)
-
-        # Generate target occupancy based on realistic patterns
-        base_occupancy = 30
-
-        # Time of day effect
-        hour = features['hour']
-        if 10 <= hour < 12:
-            base_occupancy += 45  # Peak
-        elif 8 <= hour < 10:
-            base_occupancy += 30
-        elif 12 <= hour < 14:
-            base_occupancy += 35
-        elif 14 <= hour < 17:
-            base_occupancy += 25
-        elif 17 <= hour < 20:
-            base_occupancy += 10
-
-        # Weekend effect
-        if features['is_weekend']:
-            base_occupancy *= 0.3
-
-        # Event effect
-        base_occupancy += event_impact * 30
-
-        # Weather effect
-        base_occupancy += features['weather_impact_score'] * 10
-
-        # First week / finals boost
-        if features['is_first_week']:
-            base_occupancy *= 1.2
-        if features['is_finals_week']:
-            base_occupancy *= 1.1
-
-        # Add noise
-        occupancy = base_occupancy + np.random.normal(0, 8)
-        occupancy = np.clip(occupancy, 0, 100)
-
+@functools.lru_cache(maxsize=4)
+def _synthetic_columns(n_samples: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    """
+    Generate synthetic feature and target columns as NumPy arrays.
+
+    Output is deterministic for a given (n_samples, seed), so results are
+    cached; the arrays are marked read-only and callers must copy them.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_samples
+
+    # Random timestamps within semester
+    start_date = np.datetime64('2024-08-26T00:00:00', 's')  # Fall semester start
+    days_offset = rng.integers(0, 120, n)
+    hours_offset = rng.integers(6, 22, n)  # 6am - 10pm
+    offsets = days_offset * 86400 + hours_offset * 3600
+    timestamps = start_date + offsets.astype('timedelta64[s]')
+
+    # Time features
+    time_features = extract_time_features(timestamps)
+    hour = time_features['hour']
+    day_of_week = time_features['day_of_week']
+    month = time_features['month']
+    is_weekend = time_features['is_weekend'].astype(bool)
+
+    # Academic features
+    is_class_day = day_of_week < 5
+    is_finals_week = (days_offset > 105) & (days_offset <= 112)
+    is_first_week = days_offset < 7
+
+    # Event features (random with typical probabilities)
+    is_saturday = day_of_week == 5
+    has_football_game = is_saturday & (rng.random(n) < 0.15)
+    has_basketball_game = rng.random(n) < 0.05
+    has_concert = rng.random(n) < 0.02
+    has_special_event = has_football_game | has_basketball_game | has_concert
+
+    # Event impact
+    event_impact = np.select(
+        [has_football_game, has_basketball_game, has_concert],
+        [1.0, 0.7, 0.6],
+        default=0.0,
+    )
+    hours_until_event = np.where(has_special_event, rng.integers(0, 6, n), -1)
+
+    # Weather features (seasonal with noise)
+    is_winter = np.isin(month, [12, 1, 2])
+    is_summer = np.isin(month, [6, 7, 8])
+    temperature = rng.normal(
+        np.where(is_winter, 45, np.where(is_summer, 90, 70)),  # Spring/Fall: 70
+        np.where(is_winter, 10, np.where(is_summer, 8, 12)),
+    )
+    precipitation_probability = rng.beta(2, 8, n)
+    is_raining = precipitation_probability > 0.6
+    wind_speed = np.abs(rng.normal(12, 8, n))  # Lubbock is windy!
+
+    weather_impact_score = 0.4 * is_raining
+    weather_impact_score += 0.3 * ((temperature < 40) | (temperature > 95))
+    weather_impact_score += 0.2 * (wind_speed > 25)
+    np.minimum(weather_impact_score, 1.0, out=weather_impact_score)
+
+    # Generate target occupancy based on realistic patterns
+    occupancy = np.select(
+        [
+            (hour >= 10) & (hour < 12),  # Peak
+            (hour >= 8) & (hour < 10),
+            (hour >= 12) & (hour < 14),
+            (hour >= 14) & (hour < 17),
+            (hour >= 17) & (hour < 20),
+        ],
+        [45.0, 30.0, 35.0, 25.0, 10.0],
+        default=0.0,
+    )
+    occupancy += 30  # Base occupancy
+    np.multiply(occupancy, 0.3, out=occupancy, where=is_weekend)
+    occupancy += 30 * event_impact
+    occupancy += 10 * weather_impact_score
+    np.multiply(occupancy, 1.2, out=occupancy, where=is_first_week)
+    np.multiply(occupancy, 1.1, out=occupancy, where=is_finals_week)
+
+    # Add noise
+    occupancy += rng.normal(0, 8, n)
+    np.clip(occupancy, 0, 100, out=occupancy)
+
+    # Lot features
+    lot_type = rng.choice(['commuter', 'residence', 'garage'], n, p=[0.7, 0.2, 0.1])
+
+    columns = {
+        **time_features,
+        'days_into_semester': days_offset,
+        'is_class_day': is_class_day.astype(np.int8),
+        'is_finals_week': is_finals_week.astype(np.int8),
+        'is_first_week': is_first_week.astype(np.int8),
+        'is_spring_break': np.zeros(n, dtype=np.int8),
+        'is_summer_session': np.zeros(n, dtype=np.int8),
+        'has_football_game': has_football_game.astype(np.int8),
+        'has_basketball_game': has_basketball_game.astype(np.int8),
+        'has_concert': has_concert.astype(np.int8),
+        'has_graduation': np.zeros(n, dtype=np.int8),
+        'has_special_event': has_special_event.astype(np.int8),
+        'event_impact_score': event_impact,
+        'hours_until_event': hours_until_event,
+        'temperature': temperature,
+        'precipitation_probability': precipitation_probability,
+        'is_raining': is_raining.astype(np.int8),
+        'wind_speed': wind_speed,
+        'weather_impact_score': weather_impact_score,
         # Historical features (would come from database)
-        features['avg_occupancy_same_time'] = occupancy + np.random.normal(0, 10)
-        features['avg_occupancy_last_week'] = occupancy + np.random.normal(0, 15)
-        features['trend_direction'] = np.random.choice([-1, 0, 1], p=[0.2, 0.6, 0.2])
-        features['volatility'] = np.abs(np.random.normal(15, 5))
-
+        'avg_occupancy_same_time': occupancy + rng.normal(0, 10, n),
+        'avg_occupancy_last_week': occupancy + rng.normal(0, 15, n),
+        'trend_direction': rng.choice([-1, 0, 1], n, p=[0.2, 0.6, 0.2]),
+        'volatility': np.abs(rng.normal(15, 5, n)),
         # Real-time features (simulated)
-        features['current_occupancy'] = occupancy + np.random.normal(0, 5)
-        features['recent_report_count'] = np.random.poisson(3)
-        features['recent_report_avg'] = occupancy + np.random.normal(0, 5)
-        features['minutes_since_last_report'] = np.random.exponential(15)
-        features['report_confidence'] = np.random.beta(3, 2)
-
+        'current_occupancy': occupancy + rng.normal(0, 5, n),
+        'recent_report_count': rng.poisson(3, n),
+        'recent_report_avg': occupancy + rng.normal(0, 5, n),
+        'minutes_since_last_report': rng.exponential(15, n),
+        'report_confidence': rng.beta(3, 2, n),
         # Lot features
-        features['lot_capacity'] = np.random.choice([150, 200, 300, 500])
-        features['lot_popularity'] = np.random.beta(3, 2)
-        lot_type = np.random.choice(['commuter', 'residence', 'garage'], p=[0.7, 0.2, 0.1])
-        features['is_commuter_lot'] = int(lot_type == 'commuter')
-        features['is_residence_lot'] = int(lot_type == 'residence')
-        features['is_garage_lot'] = int(lot_type == 'garage')
-
+        'lot_capacity': rng.choice([150, 200, 300, 500], n),
+        'lot_popularity': rng.beta(3, 2, n),
+        'is_commuter_lot': (lot_type == 'commuter').astype(np.int8),
+        'is_residence_lot': (lot_type == 'residence').astype(np.int8),
+        'is_garage_lot': (lot_type == 'garage').astype(np.int8),
         # Cross-lot features
-        features['nearby_lots_avg_occupancy'] = occupancy + np.random.normal(0, 10)
-        features['campus_wide_occupancy'] = occupancy + np.random.normal(-5, 12)
-
+        'nearby_lots_avg_occupancy': occupancy + rng.normal(0, 10, n),
+        'campus_wide_occupancy': occupancy + rng.normal(-5, 12, n),
         # Target
-        features['occupancy'] = occupancy
+        'occupancy': occupancy,
+    }
+
+    # Store continuous columns as float32; LightGBM consumes float32 natively
+    for name, col in columns.items():
+        if col.dtype.kind == 'f':
+            col = columns[name] = col.astype(np.float32)
+        col.flags.writeable = False
+    return columns
+
+
+def generate_synthetic_data(n_samples: int = 10000, seed: int = 42) -> pd.DataFrame:
+    """Generate synthetic training data based on typical parking patterns."""
+    return pd.DataFrame(_synthetic_columns(n_samples, seed), copy=True)
 
-        data.append(features)
 
-    return pd.DataFrame(data)
+def generate_synthetic_xy(n_samples: int = 10000, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Generate synthetic training data as a feature matrix and target vector.
+
+    Skips the DataFrame round-trip; X is float32 in column-major order so
+    each feature is contiguous for LightGBM's histogram construction.
+    """
+    columns = _synthetic_columns(n_samples, seed)
+    X = np.empty((n_samples, len(FEATURE_NAMES)), dtype=np.float32, order='F')
+    for idx, name in enumerate(FEATURE_NAMES):
+        X[:, idx] = columns[name]
+    return X, columns['occupancy'].copy()
+
+
+@functools.lru_cache(maxsize=None)
+def get_supabase_client(supabase_url: str, supabase_key: str) -> Any:
+    """Create one Supabase client per project so loading and upload share its connection pool."""
+    return create_client(supabase_url, supabase_key)
 
 
 def load_data_from_supabase(supabase_url: str, supabase_key: str) -> pd.DataFrame:
@@ -234,7 +275,7 @@ def load_data_from_supabase(supabase_url: str, supabase_key: str) -> pd.DataFram
     if not HAS_SUPABASE:
         raise ImportError("Supabase client not installed")
 
-    client = create_client(supabase_url, supabase_key)
+    client = get_supabase_client(supabase_url, supabase_key)
 
     # Query parking reports
     response = client.table('parking_reports').select('*').execute()
@@ -254,15 +295,35 @@ def load_data_from_supabase(supabase_url: str, supabase_key: str) -> pd.DataFram
 # MODEL TRAINING
 # ============================================================
 
+def split_train_val(X: np.ndarray, y: np.ndarray, val_fraction: float = 0.2,
+                    seed: int = 42) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Randomly split rows into train/validation sets, keeping X column-major."""
+    idx = np.random.default_rng(seed).permutation(len(X))
+    n_train = int(len(X) * (1 - val_fraction))
+
+    splits = []
+    for rows in (idx[:n_train], idx[n_train:]):
+        part = np.empty((len(rows), X.shape[1]), dtype=X.dtype, order='F')
+        np.take(X, rows, axis=0, out=part)
+        splits.append(part)
+
+    return splits[0], splits[1], y[idx[:n_train]], y[idx[n_train:]]
+
+
 def train_lightgbm(X_train: np.ndarray, y_train: np.ndarray,
                    X_val: np.ndarray, y_val: np.ndarray) -> Tuple[object, Dict]:
     """Train LightGBM model."""
     if not HAS_LIGHTGBM:
         return train_simple_model(X_train, y_train, X_val, y_val)
 
-    # Create datasets
-    train_data = lgb.Dataset(X_train, label=y_train, feature_name=FEATURE_NAMES)
-    val_data = lgb.Dataset(X_val, label=y_val, reference=train_data)
+    # Create datasets (validation reuses the training bin mappers)
+    train_data = lgb.Dataset(
+        X_train,
+        label=y_train,
+        feature_name=FEATURE_NAMES,
+        free_raw_data=True,
+    )
+    val_data = lgb.Dataset(X_val, label=y_val, reference=train_data, free_raw_data=True)
 
     # Parameters
     params = {
@@ -274,6 +335,10 @@ def train_lightgbm(X_train: np.ndarray, y_train: np.ndarray,
         'feature_fraction': 0.9,
         'bagging_fraction': 0.8,
         'bagging_freq': 5,
+        'max_bin': 127,
+        'feature_pre_filter': False,
+        'force_col_wise': True,  # 45 features: column-wise histograms parallelize best
+        'num_threads': os.cpu_count() or 0,
         'verbose': -1,
         'seed': 42,
     }
@@ -325,11 +390,76 @@ def train_simple_model(X_train: np.ndarray, y_train: np.ndarray,
     return model, metrics
 
 
+# Domain-knowledge tree rules exported when LightGBM is unavailable
+_HARDCODED_TREES: List[Dict] = [
+    # Tree 1: Time of day
+    {
+        'featureIndex': 0,  # hour
+        'threshold': 10,
+        'leftChild': {
+            'featureIndex': 0,
+            'threshold': 8,
+            'leftChild': -15,
+            'rightChild': 5,
+        },
+        'rightChild': {
+            'featureIndex': 0,
+            'threshold': 14,
+            'leftChild': 25,
+            'rightChild': -5,
+        },
+    },
+    # Tree 2: Weekend
+    {
+        'featureIndex': 6,  # is_weekend
+        'threshold': 0.5,
+        'leftChild': 10,
+        'rightChild': -30,
+    },
+    # Tree 3: Events
+    {
+        'featureIndex': 22,  # event_impact_score
+        'threshold': 0.3,
+        'leftChild': 0,
+        'rightChild': {
+            'featureIndex': 22,
+            'threshold': 0.7,
+            'leftChild': 15,
+            'rightChild': 35,
+        },
+    },
+    # Tree 4: Weather
+    {
+        'featureIndex': 28,  # weather_impact_score
+        'threshold': 0.3,
+        'leftChild': 0,
+        'rightChild': 10,
+    },
+    # Tree 5: Historical
+    {
+        'featureIndex': 29,  # avg_occupancy_same_time
+        'threshold': 60,
+        'leftChild': -10,
+        'rightChild': {
+            'featureIndex': 29,
+            'threshold': 80,
+            'leftChild': 5,
+            'rightChild': 15,
+        },
+    },
+]
+
+
+# Number of leading trees exported for client-side inference
+EXPORTED_TREES = 10
+
+
 def export_model_weights(model, model_type: str = 'lightgbm') -> Dict:
     """Export model weights to JSON-serializable format."""
     if HAS_LIGHTGBM and hasattr(model, 'dump_model'):
-        # LightGBM model
-        model_dump = model.dump_model()
+        # LightGBM model: only dump the trees exported for client-side use
+        num_trees = model.best_iteration or model.current_iteration()
+        model_dump = model.dump_model(num_iteration=min(num_trees, EXPORTED_TREES))
 
         # Extract trees in simplified format
         trees = []
@@ -339,10 +469,10 @@ def export_model_weights(model, model_type: str = 'lightgbm') -> Dict:
 
         return {
             'type': 'lightgbm',
-            'num_trees': len(trees),
+            'num_trees': num_trees,
             'learning_rate': model_dump.get('parameters', {}).get('learning_rate', 0.1),
             'base_score': 50,  # Starting prediction
-            'trees': trees[:10],  # Export first 10 trees for client-side
+            'trees': trees,
             'feature_names': FEATURE_NAMES,
         }
     else:
@@ -358,84 +488,79 @@ def export_model_weights(model, model_type: str = 'lightgbm') -> Dict:
 
 def simplify_tree(tree: Dict, depth: int = 0, max_depth: int = 4) -> Dict:
     """Simplify a LightGBM tree for client-side inference."""
-    if 'leaf_value' in tree:
-        return tree['leaf_value']
+    nodes = _flatten_tree(tree)
+    means = _subtree_means(nodes['left'], nodes['right'], nodes['leaf_value'])
+
+    # Rebuild top-down, collapsing subtrees at max depth to their mean
+    root: Dict = {}
+    stack = [(0, depth, root, 'tree')]
+    while stack:
+        node, node_depth, parent, key = stack.pop()
+        left, right = int(nodes['left'][node]), int(nodes['right'][node])
+        if left < 0 or node_depth >= max_depth:
+            parent[key] = float(means[node])
+            continue
+
+        simplified = {
+            'featureIndex': nodes['split_feature'][node],
+            'threshold': nodes['threshold'][node],
+            'leftChild': None,
+            'rightChild': None,
+        }
+        parent[key] = simplified
+        stack.append((right, node_depth + 1, simplified, 'rightChild'))
+        stack.append((left, node_depth + 1, simplified, 'leftChild'))
 
-    if depth >= max_depth:
-        # Return average of subtrees at max depth
-        left = simplify_tree(tree.get('left_child', {}), depth + 1, max_depth)
-        right = simplify_tree(tree.get('right_child', {}), depth + 1, max_depth)
-        if isinstance(left, (int, float)) and isinstance(right, (int, float)):
-            return (left + right) / 2
-        return 0
+    return root['tree']
 
-    return {
-        'featureIndex': tree.get('split_feature', 0),
-        'threshold': tree.get('threshold', 0),
-        'leftChild': simplify_tree(tree.get('left_child', {}), depth + 1, max_depth),
-        'rightChild': simplify_tree(tree.get('right_child', {}), depth + 1, max_depth),
+
+def _flatten_tree(tree: Dict) -> Dict[str, Any]:
+    """Flatten a LightGBM tree dump into preorder struct-of-arrays form."""
+    nodes: Dict[str, Any] = {
+        'split_feature': [], 'threshold': [], 'left': [], 'right': [], 'leaf_value': [],
     }
 
+    # (subtree, parent index, which child slot of the parent)
+    stack = [(tree, -1, '')]
+    while stack:
+        subtree, parent, side = stack.pop()
+        node = len(nodes['left'])
+        if parent >= 0:
+            nodes[side][parent] = node
+
+        nodes['split_feature'].append(subtree.get('split_feature', 0))
+        nodes['threshold'].append(subtree.get('threshold', 0))
+        nodes['leaf_value'].append(subtree.get('leaf_value', 0.0))
+        nodes['left'].append(-1)
+        nodes['right'].append(-1)
+
+        if 'leaf_value' not in subtree and ('left_child' in subtree or 'right_child' in subtree):
+            # Push right first so the left subtree is numbered next (preorder)
+            stack.append((subtree.get('right_child', {}), node, 'right'))
+            stack.append((subtree.get('left_child', {}), node, 'left'))
+
+    for key, dtype in (('left', np.int32), ('right', np.int32), ('leaf_value', np.float64)):
+        nodes[key] = np.asarray(nodes[key], dtype=dtype)
+    return nodes
+
+
+@njit(cache=True)
+def _subtree_means(left: np.ndarray, right: np.ndarray, leaf_value: np.ndarray) -> np.ndarray:
+    """Average child values bottom-up; children always follow parents in preorder."""
+    means = leaf_value.copy()
+    for node in range(len(left) - 1, -1, -1):
+        if left[node] >= 0:
+            means[node] = 0.5 * (means[left[node]] + means[right[node]])
+    return means
+
 
 def generate_hardcoded_trees() -> List[Dict]:
-    """Generate hardcoded tree rules based on domain knowledge."""
-    return [
-        # Tree 1: Time of day
-        {
-            'featureIndex': 0,  # hour
-            'threshold': 10,
-            'leftChild': {
-                'featureIndex': 0,
-                'threshold': 8,
-                'leftChild': -15,
-                'rightChild': 5,
-            },
-            'rightChild': {
-                'featureIndex': 0,
-                'threshold': 14,
-                'leftChild': 25,
-                'rightChild': -5,
-            },
-        },
-        # Tree 2: Weekend
-        {
-            'featureIndex': 6,  # is_weekend
-            'threshold': 0.5,
-            'leftChild': 10,
-            'rightChild': -30,
-        },
-        # Tree 3: Events
-        {
-            'featureIndex': 22,  # event_impact_score
-            'threshold': 0.3,
-            'leftChild': 0,
-            'rightChild': {
-                'featureIndex': 22,
-                'threshold': 0.7,
-                'leftChild': 15,
-                'rightChild': 35,
-            },
-        },
-        # Tree 4: Weather
-        {
-            'featureIndex': 28,  # weather_impact_score
-            'threshold': 0.3,
-            'leftChild': 0,
-            'rightChild': 10,
-        },
-        # Tree 5: Historical
-        {
-            'featureIndex': 29,  # avg_occupancy_same_time
-            'threshold': 60,
-            'leftChild': -10,
-            'rightChild': {
-                'featureIndex': 29,
-                'threshold': 80,
-                'leftChild': 5,
-                'rightChild': 15,
-            },
-        },
-    ]
+    """
+    Return hardcoded tree rules based on domain knowledge.
+
+    Returns a fresh copy, so callers may mutate it.
+    """
+    return copy.deepcopy(_HARDCODED_TREES)
 
 
 # ============================================================
@@ -450,7 +575,7 @@ def upload_model_to_supabase(supabase_url: str, supabase_key: str,
         return False
 
     try:
-        client = create_client(supabase_url, supabase_key)
+        client = get_supabase_client(supabase_url, supabase_key)
 
         # Deactivate previous models
         client.table('ml_models').update({'is_active': False}).eq('model_type', 'gradient_boosting').execute()
@@ -494,20 +619,24 @@ def main():
     print("\n[1/4] Loading training data...")
     if args.local or not (args.supabase_url and args.supabase_key):
         print("Using synthetic data...")
-        df = generate_synthetic_data(10000)
+        X, y = generate_synthetic_xy(10000)
+        print(f"Loaded {len(X)} samples")
+        print("\n[2/4] Preparing features...")
     else:
         df = load_data_from_supabase(args.supabase_url, args.supabase_key)
+        print(f"Loaded {len(df)} samples")
 
-    print(f"Loaded {len(df)} samples")
-
-    # Prepare features
-    print("\n[2/4] Preparing features...")
-    feature_cols = [c for c in FEATURE_NAMES if c in df.columns]
-    X = df[feature_cols].values
-    y = df['occupancy'].values
+        # Prepare features
+        print("\n[2/4] Preparing features...")
+        # LightGBM is trained with feature_name=FEATURE_NAMES, so all must be present
+        missing = set(FEATURE_NAMES).difference(df.columns)
+        if missing:
+            raise ValueError(f"Training data is missing features: {sorted(missing)}")
+        X = np.asfortranarray(df[FEATURE_NAMES].to_numpy(np.float32))
+        y = df['occupancy'].to_numpy()
 
     # Split data
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_val, y_train, y_val = split_train_val(X, y, val_fraction=0.2, seed=42)
     print(f"Training samples: {len(X_train)}, Validation samples: {len(X_val)}")
 
     # Train model
@@ -523,13 +652,18 @@ def main():
     model_weights = export_model_weights(model)
 
     # Save locally
-    with open(args.output, 'w') as f:
-        json.dump({
-            'model': model_weights,
-            'metrics': metrics,
-            'trained_at': datetime.now().isoformat(),
-            'feature_names': FEATURE_NAMES,
-        }, f, indent=2)
+    payload = {
+        'model': model_weights,
+        'metrics': metrics,
+        'trained_at': datetime.now().isoformat(),
+        'feature_names': FEATURE_NAMES,
+    }
+    if HAS_ORJSON:
+        with open(args.output, 'wb') as f:
+            f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(payload, f, indent=2)
     print(f"Model saved to {args.output}")
 
     # Upload to Supabase if credentials provided
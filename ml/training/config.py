@@ -8,13 +8,22 @@ Centralized configuration management with:
 - Validation and evaluation settings
 """
 
+import functools
 import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import yaml
 
+# Prefer the libyaml-backed C loader/dumper when available
+try:
+    from yaml import CSafeDumper as _YamlDumper
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper
+    from yaml import SafeLoader as _YamlLoader
+
 
 @dataclass
 class DataConfig:
@@ -35,10 +44,21 @@ class DataConfig:
     # Sampling
     sample_interval_minutes: int = 15
 
+    # Seed for the sample data generated when the database is unavailable
+    random_seed: int = 42
+
     # Lot filtering
     include_lots: Optional[List[str]] = None
     exclude_lots: Optional[List[str]] = None
 
+    # Rows per PostgREST range request (must not exceed the API's max_rows)
+    query_page_size: int = 1000
+
+    # On-disk Arrow IPC cache of fetched tables (None disables caching).
+    # Windows ending before today never expire; ones reaching today use the TTL.
+    cache_dir: Optional[str] = "~/.cache/raiderpark"
+    cache_ttl_minutes: int = 5
+
 
 @dataclass
 class FeatureConfig:
@@ -59,6 +79,13 @@ class FeatureConfig:
     # Weather API settings
     weather_forecast_hours: int = 48
     weather_cache_ttl_seconds: int = 3600
+    weather_match_tolerance_minutes: int = 30  # Max gap to the nearest weather reading
+
+    # Train on float32 features and targets (halves memory traffic)
+    fp32: bool = True
+
+    # Reuse engineered features from model_dir/.feat_cache across runs
+    cache: bool = True
 
     # Event features
     event_lookahead_days: int = 7
@@ -87,6 +114,10 @@ class ModelConfig:
     tft_decoder_length: int = 24
     tft_learning_rate: float = 1e-3
     tft_max_epochs: int = 100
+    tft_devices: int = 1  # >1 relaunches training under torchrun with DDP
+    tft_strategy: str = "auto"  # "auto"/"ddp" train data-parallel under torchrun, "single" never does
+    tft_num_nodes: int = 1  # Only single-node launches are supported
+    tft_tf32: bool = False  # TF32 matmuls on Ampere+ GPUs (affects the whole process)
 
     # LightGBM hyperparameters
     lgb_num_leaves: int = 63
@@ -98,6 +129,7 @@ class ModelConfig:
     # Ensemble settings
     ensemble_strategy: str = "stacking"  # "stacking", "weighted_avg"
     ensemble_n_folds: int = 5
+    ensemble_n_jobs: int = 1  # CV folds trained concurrently (-1 = all cores)
 
     # Quantiles for prediction intervals
     quantiles: List[float] = field(default_factory=lambda: [0.1, 0.5, 0.9])
@@ -116,6 +148,9 @@ class TrainingRunConfig:
     num_workers: int = 4
     random_seed: int = 42
 
+    # MKL_NUM_THREADS exported to worker processes (None leaves BLAS defaults)
+    blas_threads: Optional[int] = None
+
     # Early stopping
     early_stopping_patience: int = 10
     early_stopping_min_delta: float = 0.001
@@ -197,7 +232,7 @@ class TrainingConfig:
             TrainingConfig instance
         """
         with open(path, "r") as f:
-            config_dict = yaml.safe_load(f)
+            config_dict = yaml.load(f, Loader=_YamlLoader)
 
         return cls._from_dict(config_dict)
 
@@ -229,26 +264,11 @@ class TrainingConfig:
             TrainingConfig instance
         """
         config = cls()
+        env_values = tuple(os.environ.get(name) for name, _, _, _ in _ENV_OVERRIDES)
 
-        # Model type
-        if model_type := os.getenv("RAIDERPARK_ML_MODEL_TYPE"):
-            config.model.model_type = model_type
-
-        # Paths
-        if data_dir := os.getenv("RAIDERPARK_ML_DATA_DIR"):
-            config.data_dir = Path(data_dir)
-        if model_dir := os.getenv("RAIDERPARK_ML_MODEL_DIR"):
-            config.model_dir = Path(model_dir)
-
-        # MLflow
-        if tracking_uri := os.getenv("MLFLOW_TRACKING_URI"):
-            config.mlflow_tracking_uri = tracking_uri
-
-        # Training parameters
-        if batch_size := os.getenv("RAIDERPARK_ML_BATCH_SIZE"):
-            config.training.batch_size = int(batch_size)
-        if epochs := os.getenv("RAIDERPARK_ML_MAX_EPOCHS"):
-            config.model.tft_max_epochs = int(epochs)
+        for section, attr, value in _parse_env_overrides(env_values):
+            target = getattr(config, section) if section else config
+            setattr(target, attr, value)
 
         return config
 
@@ -283,7 +303,13 @@ class TrainingConfig:
             path: Path to save YAML file
         """
         with open(path, "w") as f:
-            yaml.dump(self.to_dict(), f, default_flow_style=False)
+            yaml.dump(
+                self.to_dict(),
+                f,
+                Dumper=_YamlDumper,
+                default_flow_style=False,
+                sort_keys=False,
+            )
 
     def validate(self) -> List[str]:
         """
@@ -309,6 +335,21 @@ class TrainingConfig:
                 f"Must be one of: {valid_models}"
             )
 
+        # Validate TFT distribution strategy
+        valid_strategies = ["auto", "ddp", "single"]
+        if self.model.tft_strategy not in valid_strategies:
+            errors.append(
+                f"Invalid tft_strategy '{self.model.tft_strategy}'. "
+                f"Must be one of: {valid_strategies}"
+            )
+
+        # The built-in torchrun relaunch has no rendezvous settings
+        if self.model.tft_num_nodes != 1:
+            errors.append(
+                f"tft_num_nodes={self.model.tft_num_nodes} is not supported; "
+                "launch multi-node runs with torchrun directly and leave it at 1"
+            )
+
         # Validate quantiles
         for q in self.model.quantiles:
             if not 0 < q < 1:
@@ -321,6 +362,29 @@ class TrainingConfig:
         return errors
 
 
+# Environment overrides: (variable, config section or None for top level, attribute, parser)
+_ENV_OVERRIDES: Tuple[Tuple[str, Optional[str], str, Callable[[str], Any]], ...] = (
+    ("RAIDERPARK_ML_MODEL_TYPE", "model", "model_type", str),
+    ("RAIDERPARK_ML_DATA_DIR", None, "data_dir", Path),
+    ("RAIDERPARK_ML_MODEL_DIR", None, "model_dir", Path),
+    ("MLFLOW_TRACKING_URI", None, "mlflow_tracking_uri", str),
+    ("RAIDERPARK_ML_BATCH_SIZE", "training", "batch_size", int),
+    ("RAIDERPARK_ML_MAX_EPOCHS", "model", "tft_max_epochs", int),
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_env_overrides(
+    env_values: Tuple[Optional[str], ...],
+) -> Tuple[Tuple[Optional[str], str, Any], ...]:
+    """Parse environment override values, memoized on the raw values."""
+    return tuple(
+        (section, attr, parse(value))
+        for (_, section, attr, parse), value in zip(_ENV_OVERRIDES, env_values)
+        if value
+    )
+
+
 def get_default_config() -> TrainingConfig:
     """Get default training configuration."""
     return TrainingConfig()
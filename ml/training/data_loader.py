@@ -5,17 +5,137 @@ Loads historical parking data, weather data, and events
 from the Supabase database for model training.
 """
 
+import functools
+import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
-
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 
 from ml.utils.supabase_client import get_supabase_client, SupabaseClient
 from ml.training.config import DataConfig
 
 logger = logging.getLogger(__name__)
 
+# Lot IDs per in_ filter request; the list is encoded in the URL, which
+# PostgREST (and proxies in front of it) cap at a few KB
+IN_FILTER_CHUNK_SIZE = 100
+
+# Rows per Parquet row group when spilling loaded data to disk
+SPILL_ROW_GROUP_SIZE = 100_000
+
+# Lot ids are a handful of distinct strings, so they load as dictionary
+# arrays (pandas Categorical: int32 codes instead of one object per row)
+LOT_ID_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+# Column types for rows returned by each table query (temporal columns are
+# sent as ISO strings and parsed by Arrow when each page is converted)
+OCCUPANCY_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("lot_id", LOT_ID_TYPE),
+    ("occupancy_percent", pa.float32()),
+    ("total_spots", pa.int32()),
+    ("available_spots", pa.int32()),
+])
+
+WEATHER_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("temperature", pa.float32()),
+    ("precipitation", pa.float32()),
+    ("wind_speed", pa.float32()),
+    ("humidity", pa.float32()),
+    ("conditions", pa.string()),
+])
+
+EVENTS_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("event_type", pa.string()),
+    ("name", pa.string()),
+    ("expected_attendance", pa.int32()),
+    ("venue", pa.string()),
+    ("start_time", pa.string()),
+    ("end_time", pa.string()),
+])
+
+REPORTS_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("lot_id", LOT_ID_TYPE),
+    ("reported_status", pa.string()),
+])
+
+# training_dataset RPC result keys -> (table, schema)
+RPC_SOURCES = {
+    "occupancy": ("parking_occupancy", OCCUPANCY_SCHEMA),
+    "weather": ("weather_data", WEATHER_SCHEMA),
+    "events": ("events", EVENTS_SCHEMA),
+    "reports": ("parking_reports", REPORTS_SCHEMA),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _wire_schema(schema: pa.Schema) -> pa.Schema:
+    """Schema of the JSON rows, with temporal columns still as strings."""
+    return pa.schema([
+        pa.field(f.name, pa.string()) if pa.types.is_temporal(f.type) else f
+        for f in schema
+    ])
+
+
+def _parse_timestamps(column: pa.ChunkedArray, type_: pa.TimestampType) -> pa.ChunkedArray:
+    """
+    Parse ISO strings into a zoned timestamp type.
+
+    Strings without a zone offset (PostgREST's form for timestamp without
+    time zone columns) are taken to be in the target zone.
+    """
+    try:
+        return column.cast(type_)
+    except pa.ArrowInvalid:
+        return pc.assume_timezone(column.cast(pa.timestamp(type_.unit)), type_.tz)
+
+
+def _rows_to_table(rows: List[Dict[str, Any]], schema: pa.Schema) -> pa.Table:
+    """Convert JSON rows to a typed Arrow table, parsing timestamps and dates in C."""
+    table = pa.Table.from_pylist(rows, schema=_wire_schema(schema))
+    for i, field in enumerate(schema):
+        if pa.types.is_timestamp(field.type) and field.type.tz is not None:
+            table = table.set_column(i, field.name, _parse_timestamps(table.column(i), field.type))
+    return table.cast(schema)
+
+
+def _table_to_frame(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table to pandas with dates as datetime64 columns."""
+    return table.to_pandas(date_as_object=False)
+
+
+# One Supabase client per process, so every loader (and loader thread)
+# reuses the same HTTP connection pool instead of opening new connections
+_shared_client: Optional[SupabaseClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def _get_shared_client() -> SupabaseClient:
+    """Get or initialize the process-wide Supabase client."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = get_supabase_client()
+    return _shared_client
+
 
 class DataLoader:
     """
@@ -43,12 +163,16 @@ class DataLoader:
         """
         self.config = config or DataConfig()
         self._client = supabase_client
+        # Raw frames from the training_dataset RPC, consumed by the table loaders
+        self._prefetched: Dict[Tuple[str, str], pd.DataFrame] = {}
+        # Private temporary directories holding spilled Parquet files
+        self._spill_dirs: List[tempfile.TemporaryDirectory] = []
 
     @property
     def client(self) -> SupabaseClient:
-        """Get or initialize Supabase client."""
+        """Get or initialize Supabase client (safe to call from loader threads)."""
         if self._client is None:
-            self._client = get_supabase_client()
+            self._client = _get_shared_client()
         return self._client
 
     def load_training_data(
@@ -56,36 +180,79 @@ class DataLoader:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         lot_ids: Optional[List[str]] = None,
-    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        spill: bool = False,
+    ) -> Tuple[Any, Any, Any, Any]:
         """
         Load all training data from Supabase.
 
+        All four sources are first requested in one round trip through the
+        training_dataset RPC. If that fails, the sources are fetched from their
+        tables concurrently; each loader keeps its own fallback so one failure
+        doesn't affect the rest.
+
+        With spill=True each source is written to a ZSTD Parquet file as soon
+        as it is loaded and returned as a pyarrow Dataset, so the frames are
+        not all held in memory at once; consumers stream them with
+        dataset.to_batches(columns=[...]). Each call spills into its own
+        temporary directory, removed by cleanup_spill() (or when the loader
+        is garbage collected).
+
         Args:
             start_date: Start date for data (default from config)
             end_date: End date for data (default from config)
             lot_ids: Optional list of lot IDs to include
+            spill: Return Parquet-backed datasets instead of DataFrames
 
         Returns:
-            Tuple of (occupancy_df, weather_df, events_df)
+            Tuple of (occupancy, weather, events, reports) DataFrames, or
+            pyarrow Datasets when spill is set
         """
         start = start_date or self.config.train_start_date
         end = end_date or self.config.train_end_date
 
         logger.info(f"Loading training data from {start} to {end}")
 
+        try:
+            self._prefetch_training_dataset(start, end, lot_ids)
+        except Exception as e:
+            logger.warning(f"training_dataset RPC failed, querying tables separately: {e}")
+
+        if spill:
+            spill_dir = tempfile.TemporaryDirectory(prefix="rp_spill_")
+            self._spill_dirs.append(spill_dir)
+
+        def load(table: str, loader: Callable[..., pd.DataFrame], *args: Any) -> Any:
+            df = loader(*args)
+            if not spill:
+                return df
+            return self._spill_to_parquet(df, Path(spill_dir.name) / f"{table}.parquet")
+
         # Load all data sources
-        occupancy_df = self.load_occupancy_data(start, end, lot_ids)
-        weather_df = self.load_weather_data(start, end)
-        events_df = self.load_events_data(start, end)
-        reports_df = self.load_reports_data(start, end, lot_ids)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            occupancy_future = executor.submit(
+                load, "parking_occupancy", self.load_occupancy_data, start, end, lot_ids
+            )
+            weather_future = executor.submit(load, "weather_data", self.load_weather_data, start, end)
+            events_future = executor.submit(load, "events", self.load_events_data, start, end)
+            reports_future = executor.submit(
+                load, "parking_reports", self.load_reports_data, start, end, lot_ids
+            )
+
+            occupancy = occupancy_future.result()
+            weather = weather_future.result()
+            events = events_future.result()
+            reports = reports_future.result()
+
+        def count(data: Any) -> int:
+            return data.count_rows() if spill else len(data)
 
         logger.info(
-            f"Loaded {len(occupancy_df)} occupancy records, "
-            f"{len(weather_df)} weather records, "
-            f"{len(events_df)} events"
+            f"Loaded {count(occupancy)} occupancy records, "
+            f"{count(weather)} weather records, "
+            f"{count(events)} events"
         )
 
-        return occupancy_df, weather_df, events_df, reports_df
+        return occupancy, weather, events, reports
 
     def load_occupancy_data(
         self,
@@ -104,35 +271,35 @@ class DataLoader:
         Returns:
             DataFrame with occupancy records
         """
-        try:
+        def build_query(lots=None):
             query = self.client.table("parking_occupancy").select(
                 "timestamp, lot_id, occupancy_percent, total_spots, available_spots"
             ).gte("timestamp", start_date).lte("timestamp", end_date)
 
-            if lot_ids:
-                query = query.in_("lot_id", lot_ids)
-            elif self.config.include_lots:
-                query = query.in_("lot_id", self.config.include_lots)
-            elif self.config.exclude_lots:
-                # Supabase doesn't have not_in, so we filter after
-                pass
+            if lots:
+                query = query.in_("lot_id", lots)
+            if self.config.exclude_lots:
+                query = query.not_.in_("lot_id", self.config.exclude_lots)
 
-            response = query.order("timestamp").execute()
-            df = pd.DataFrame(response.data)
+            return query.order("timestamp").order("lot_id")
 
-            if self.config.exclude_lots and not df.empty:
-                df = df[~df["lot_id"].isin(self.config.exclude_lots)]
+        try:
+            df = self._fetch_cached(
+                "parking_occupancy", start_date, end_date, build_query, OCCUPANCY_SCHEMA,
+                lot_ids=lot_ids, chunk_lots=lot_ids or self.config.include_lots,
+            )
 
             # Rename for consistency
             df = df.rename(columns={"occupancy_percent": "occupancy"})
 
-            # Ensure datetime
-            if "timestamp" in df.columns:
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
-
             logger.info(f"Loaded {len(df)} occupancy records")
             return df
 
+        except pa.ArrowInvalid as e:
+            # Rows that fail to parse are a data problem, not an outage: never
+            # replace them with sample data
+            logger.error(f"Failed to parse occupancy data: {e}")
+            raise
         except Exception as e:
             logger.warning(f"Failed to load occupancy data: {e}")
             return self._generate_sample_occupancy_data(start_date, end_date, lot_ids)
@@ -153,18 +320,22 @@ class DataLoader:
             DataFrame with weather records
         """
         try:
-            response = self.client.table("weather_data").select(
-                "timestamp, temperature, precipitation, wind_speed, humidity, conditions"
-            ).gte("timestamp", start_date).lte("timestamp", end_date).execute()
-
-            df = pd.DataFrame(response.data)
-
-            if "timestamp" in df.columns:
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
+            df = self._fetch_cached(
+                "weather_data", start_date, end_date,
+                lambda: self.client.table("weather_data").select(
+                    "timestamp, temperature, precipitation, wind_speed, humidity, conditions"
+                ).gte("timestamp", start_date).lte("timestamp", end_date)
+                # id breaks timestamp ties, so range pages never overlap or skip rows
+                .order("timestamp").order("id"),
+                WEATHER_SCHEMA,
+            )
 
             logger.info(f"Loaded {len(df)} weather records")
             return df
 
+        except pa.ArrowInvalid as e:
+            logger.error(f"Failed to parse weather data: {e}")
+            raise
         except Exception as e:
             logger.warning(f"Failed to load weather data: {e}")
             return self._generate_sample_weather_data(start_date, end_date)
@@ -185,18 +356,20 @@ class DataLoader:
             DataFrame with events
         """
         try:
-            response = self.client.table("events").select(
-                "date, event_type, name, expected_attendance, venue, start_time, end_time"
-            ).gte("date", start_date).lte("date", end_date).execute()
-
-            df = pd.DataFrame(response.data)
-
-            if "date" in df.columns:
-                df["date"] = pd.to_datetime(df["date"])
+            df = self._fetch_cached(
+                "events", start_date, end_date,
+                lambda: self.client.table("events").select(
+                    "date, event_type, name, expected_attendance, venue, start_time, end_time"
+                ).gte("date", start_date).lte("date", end_date).order("date").order("name"),
+                EVENTS_SCHEMA,
+            )
 
             logger.info(f"Loaded {len(df)} events")
             return df
 
+        except pa.ArrowInvalid as e:
+            logger.error(f"Failed to parse events data: {e}")
+            raise
         except Exception as e:
             logger.warning(f"Failed to load events data: {e}")
             return self._generate_sample_events_data(start_date, end_date)
@@ -218,23 +391,28 @@ class DataLoader:
         Returns:
             DataFrame with user reports
         """
-        try:
+        def build_query(lots=None):
             query = self.client.table("parking_reports").select(
-                "timestamp, lot_id, reported_status, user_id"
+                "timestamp, lot_id, reported_status"
             ).gte("timestamp", start_date).lte("timestamp", end_date)
 
-            if lot_ids:
-                query = query.in_("lot_id", lot_ids)
+            if lots:
+                query = query.in_("lot_id", lots)
 
-            response = query.execute()
-            df = pd.DataFrame(response.data)
+            return query.order("timestamp").order("lot_id")
 
-            if "timestamp" in df.columns:
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
+        try:
+            df = self._fetch_cached(
+                "parking_reports", start_date, end_date, build_query, REPORTS_SCHEMA,
+                lot_ids=lot_ids, chunk_lots=lot_ids,
+            )
 
             logger.info(f"Loaded {len(df)} user reports")
             return df
 
+        except pa.ArrowInvalid as e:
+            logger.error(f"Failed to parse reports data: {e}")
+            raise
         except Exception as e:
             logger.warning(f"Failed to load reports data: {e}")
             return pd.DataFrame(columns=["timestamp", "lot_id", "reported_status"])
@@ -259,6 +437,271 @@ class DataLoader:
             logger.warning(f"Failed to load lot metadata: {e}")
             return self._generate_sample_lot_metadata()
 
+    def cleanup_spill(self) -> None:
+        """Remove the files spilled by load_training_data(spill=True)."""
+        for spill_dir in self._spill_dirs:
+            spill_dir.cleanup()
+        self._spill_dirs.clear()
+
+    def _spill_to_parquet(self, df: pd.DataFrame, path: Path) -> ds.Dataset:
+        """
+        Write a loaded frame to a ZSTD Parquet file and open it as a dataset.
+
+        Args:
+            df: Loaded frame
+            path: File to write, inside a spill directory private to the call
+
+        Returns:
+            pyarrow Dataset over the written file
+        """
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            path,
+            compression="zstd",
+            row_group_size=SPILL_ROW_GROUP_SIZE,
+        )
+        return ds.dataset(path, format="parquet")
+
+    def _prefetch_training_dataset(
+        self,
+        start_date: str,
+        end_date: str,
+        lot_ids: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Fetch all training sources with a single training_dataset RPC call.
+
+        The raw frames are handed to the table loaders (and written to the
+        on-disk cache), so they apply their usual post-processing. Nothing is
+        requested when every source is already cached.
+
+        Args:
+            start_date: Start date
+            end_date: End date
+            lot_ids: Optional list of lot IDs
+        """
+        digests = {
+            table: self._cache_digest(table, schema, start_date, end_date, lot_ids)
+            for table, schema in RPC_SOURCES.values()
+        }
+        if all(
+            self._cached_path(table, digest, end_date) is not None
+            for table, digest in digests.items()
+        ):
+            return
+
+        response = self.client.rpc("training_dataset", {
+            "p_start": start_date,
+            "p_end": end_date,
+            "p_lot_ids": lot_ids or None,
+            "p_include_lots": self.config.include_lots or None,
+            "p_exclude_lots": self.config.exclude_lots or None,
+        }).execute()
+
+        for key, (table, schema) in RPC_SOURCES.items():
+            df = _table_to_frame(_rows_to_table(response.data[key], schema))
+            self._prefetched[(table, digests[table])] = df
+            self._write_cache(table, digests[table], df)
+
+    def _fetch_cached(
+        self,
+        table: str,
+        start_date: str,
+        end_date: str,
+        build_query: Callable[..., Any],
+        schema: pa.Schema,
+        lot_ids: Optional[List[str]] = None,
+        chunk_lots: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Fetch a query, reusing RPC results or the on-disk Arrow IPC cache.
+
+        Only successful fetches are cached, so failures still fall back normally.
+
+        Args:
+            table: Table name (cache namespace)
+            start_date: Start of the queried window
+            end_date: End of the queried window
+            build_query: Factory returning the filtered, ordered query
+            schema: Arrow schema of the selected columns
+            lot_ids: Optional list of lot IDs the query is filtered to
+            chunk_lots: Lot IDs for build_query's in_ filter (see _fetch_frame)
+
+        Returns:
+            DataFrame with all rows
+        """
+        digest = self._cache_digest(table, schema, start_date, end_date, lot_ids)
+
+        df = self._prefetched.pop((table, digest), None)
+        if df is not None:
+            return df
+
+        path = self._cached_path(table, digest, end_date)
+        if path is not None:
+            logger.info(f"Using cached {table} data from {path}")
+            return _table_to_frame(feather.read_table(path, memory_map=True))
+
+        df = self._fetch_frame(build_query, schema, chunk_lots)
+        self._write_cache(table, digest, df)
+        return df
+
+    def _cache_digest(
+        self,
+        table: str,
+        schema: pa.Schema,
+        start_date: str,
+        end_date: str,
+        lot_ids: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Hash the selected columns and their types, the date window and the lot
+        filters that apply to a table.
+
+        The schema lists exactly the selected columns, so changing the select
+        list or a column type invalidates entries that would otherwise never
+        expire.
+        """
+        if table == "parking_occupancy":
+            lot_filters = (lot_ids, self.config.include_lots, self.config.exclude_lots)
+        elif table == "parking_reports":
+            lot_filters = (lot_ids,)
+        else:
+            lot_filters = ()
+
+        key = repr((
+            schema.to_string(show_schema_metadata=False),
+            start_date,
+            end_date,
+            *(tuple(sorted(lots)) if lots else None for lots in lot_filters),
+        ))
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def _cached_path(self, table: str, digest: str, end_date: str) -> Optional[Path]:
+        """
+        Return the cache file for a query if it exists and is still fresh.
+
+        Windows that end before today are immutable and never expire; windows
+        reaching today are refetched once older than cache_ttl_minutes.
+        """
+        if not self.config.cache_dir:
+            return None
+
+        path = self._cache_file(table, digest)
+        if not path.exists():
+            return None
+
+        is_closed_window = str(end_date)[:10] < date.today().isoformat()
+        age_seconds = time.time() - path.stat().st_mtime
+        if is_closed_window or age_seconds < self.config.cache_ttl_minutes * 60:
+            return path
+        return None
+
+    def _cache_file(self, table: str, digest: str) -> Path:
+        """
+        Cache file for a query.
+
+        Stored as uncompressed Arrow IPC (Feather v2), the in-memory columnar
+        layout itself, so a cache hit is a memory map rather than a decode.
+        """
+        return Path(self.config.cache_dir).expanduser() / table / f"{digest}.arrow"
+
+    def _write_cache(self, table: str, digest: str, df: pd.DataFrame) -> None:
+        """Write a fetched frame to the cache (atomically, so readers never see partial files)."""
+        if not self.config.cache_dir:
+            return
+
+        path = self._cache_file(table, digest)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            feather.write_feather(
+                pa.Table.from_pandas(df, preserve_index=False),
+                tmp_path,
+                compression="uncompressed",
+            )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache {table} data: {e}")
+
+    def _fetch_frame(
+        self,
+        build_query: Callable[..., Any],
+        schema: pa.Schema,
+        chunk_lots: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Fetch every row of a query, splitting long lot filters into chunks.
+
+        When chunk_lots is given, build_query takes a list of lot IDs for its
+        in_ filter. PostgREST encodes in_ lists in the request URL, so long
+        lists are split into chunks of IN_FILTER_CHUNK_SIZE lots that are
+        fetched concurrently and re-sorted by timestamp afterwards.
+
+        Args:
+            build_query: Factory returning the filtered, ordered query
+            schema: Arrow schema of the selected columns
+            chunk_lots: Optional lot IDs to pass to build_query in chunks
+
+        Returns:
+            DataFrame with all rows
+        """
+        if not chunk_lots:
+            tables = self._fetch_pages(build_query, schema)
+        elif len(chunk_lots) <= IN_FILTER_CHUNK_SIZE:
+            tables = self._fetch_pages(lambda: build_query(chunk_lots), schema)
+        else:
+            chunks = [
+                chunk_lots[i:i + IN_FILTER_CHUNK_SIZE]
+                for i in range(0, len(chunk_lots), IN_FILTER_CHUNK_SIZE)
+            ]
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                chunk_tables = executor.map(
+                    lambda chunk: self._fetch_pages(lambda: build_query(chunk), schema),
+                    chunks,
+                )
+                tables = [table for tables in chunk_tables for table in tables]
+
+        if not tables:
+            return _table_to_frame(schema.empty_table())
+
+        df = _table_to_frame(pa.concat_tables(tables))
+        if chunk_lots and len(chunk_lots) > IN_FILTER_CHUNK_SIZE:
+            df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+        return df
+
+    def _fetch_pages(self, build_query: Callable[[], Any], schema: pa.Schema) -> List[pa.Table]:
+        """
+        Fetch every row of a query using PostgREST range pagination.
+
+        A single request is silently truncated at the API's max_rows, so pages
+        are requested until a short page comes back. build_query must return a
+        fresh, deterministically ordered query builder on each call, because
+        postgrest builders accumulate range parameters.
+
+        Each page is converted to a typed Arrow table, so pandas receives
+        contiguous typed columns instead of inferring dtypes from row dicts.
+
+        Args:
+            build_query: Factory returning the filtered, ordered query
+            schema: Arrow schema of the selected columns
+
+        Returns:
+            One Arrow table per non-empty page
+        """
+        page_size = self.config.query_page_size
+        tables = []
+        offset = 0
+
+        while True:
+            rows = build_query().range(offset, offset + page_size - 1).execute().data
+            if rows:
+                tables.append(_rows_to_table(rows, schema))
+            if len(rows) < page_size:
+                break
+            offset += page_size
+
+        return tables
+
     def split_data(
         self,
         df: pd.DataFrame,
@@ -268,7 +711,9 @@ class DataLoader:
         """
         Split data into train/validation/test sets.
 
-        Uses temporal split to respect time-series nature of data.
+        Uses temporal split to respect time-series nature of data: the cuts
+        are placed at fractions of the covered time span, so every lot shares
+        the same boundary timestamps and no timestamp straddles two sets.
 
         Args:
             df: Full dataset
@@ -282,16 +727,22 @@ class DataLoader:
         test_frac = test_split or self.config.test_split
         train_frac = 1.0 - val_frac - test_frac
 
-        # Sort by timestamp
-        df = df.sort_values("timestamp")
-        n = len(df)
+        # Sort by timestamp (skipped when the data already arrives in order)
+        if not df["timestamp"].is_monotonic_increasing:
+            df = df.sort_values("timestamp", kind="stable")
 
-        train_end = int(n * train_frac)
-        val_end = int(n * (train_frac + val_frac))
+        if df.empty:
+            train_end = val_end = 0
+        else:
+            t0 = df["timestamp"].iloc[0]
+            span = df["timestamp"].iloc[-1] - t0
+            train_end = df["timestamp"].searchsorted(t0 + span * train_frac)
+            val_end = df["timestamp"].searchsorted(t0 + span * (train_frac + val_frac))
 
-        train_df = df.iloc[:train_end].copy()
-        val_df = df.iloc[train_end:val_end].copy()
-        test_df = df.iloc[val_end:].copy()
+        # Slices, not copies: feature engineering copies its input before mutating
+        train_df = df.iloc[:train_end]
+        val_df = df.iloc[train_end:val_end]
+        test_df = df.iloc[val_end:]
 
         logger.info(
             f"Split data: train={len(train_df)}, val={len(val_df)}, test={len(test_df)}"
@@ -321,34 +772,41 @@ class DataLoader:
             quality_report["issues"].append(f"Missing columns: {missing_cols}")
             return df, quality_report
 
-        # Remove duplicates
-        n_before = len(df)
-        df = df.drop_duplicates(subset=["timestamp", "lot_id"])
-        n_dupes = n_before - len(df)
+        # Sort once; duplicates are then adjacent and the first of each run is kept.
+        # Lots are factorized to integer codes so the row comparisons below (and
+        # the per-lot gap counts) run on plain NumPy arrays.
+        df = df.sort_values(["lot_id", "timestamp"], kind="stable")
+        lot_codes, lot_names = pd.factorize(df["lot_id"], use_na_sentinel=False)
+        timestamps = df["timestamp"].values  # datetime64, also for tz-aware columns
+
+        is_dupe = np.zeros(len(df), dtype=bool)
+        is_dupe[1:] = (lot_codes[1:] == lot_codes[:-1]) & (timestamps[1:] == timestamps[:-1])
+        n_dupes = int(is_dupe.sum())
         if n_dupes > 0:
             quality_report["issues"].append(f"Removed {n_dupes} duplicate rows")
+            keep = ~is_dupe
+            df = df[keep]
+            lot_codes = lot_codes[keep]
+            timestamps = timestamps[keep]
 
         # Check for invalid occupancy values
         invalid_occ = (df["occupancy"] < 0) | (df["occupancy"] > 100)
         n_invalid = invalid_occ.sum()
         if n_invalid > 0:
             quality_report["issues"].append(f"Found {n_invalid} invalid occupancy values")
-            df.loc[df["occupancy"] < 0, "occupancy"] = 0
-            df.loc[df["occupancy"] > 100, "occupancy"] = 100
+            df["occupancy"] = df["occupancy"].clip(0, 100)
 
         # Check for gaps in time series
-        df = df.sort_values(["lot_id", "timestamp"])
         expected_interval = timedelta(minutes=self.config.sample_interval_minutes)
 
-        for lot_id in df["lot_id"].unique():
-            lot_data = df[df["lot_id"] == lot_id]
-            time_diffs = lot_data["timestamp"].diff()
-            large_gaps = time_diffs > expected_interval * 2
-            if large_gaps.any():
-                n_gaps = large_gaps.sum()
-                quality_report["issues"].append(
-                    f"Lot {lot_id}: {n_gaps} time gaps > {expected_interval * 2}"
-                )
+        large_gaps = (lot_codes[1:] == lot_codes[:-1]) & (
+            np.diff(timestamps) > np.timedelta64(expected_interval * 2)
+        )
+        gaps_per_lot = np.bincount(lot_codes[1:][large_gaps], minlength=len(lot_names))
+        for code in np.flatnonzero(gaps_per_lot):
+            quality_report["issues"].append(
+                f"Lot {lot_names[code]}: {gaps_per_lot[code]} time gaps > {expected_interval * 2}"
+            )
 
         quality_report["final_rows"] = len(df)
         quality_report["rows_removed"] = quality_report["original_rows"] - len(df)
@@ -362,45 +820,45 @@ class DataLoader:
         lot_ids: Optional[List[str]] = None,
     ) -> pd.DataFrame:
         """Generate sample occupancy data for testing when DB unavailable."""
-        import numpy as np
-
         logger.info("Generating sample occupancy data")
+        rng = np.random.default_rng(self.config.random_seed)
 
         start = pd.to_datetime(start_date)
         end = pd.to_datetime(end_date)
 
         lots = lot_ids or ["lot_a", "lot_b", "lot_c", "lot_d", "lot_e"]
-        timestamps = pd.date_range(start, end, freq="15T")
-
-        records = []
-        for lot in lots:
-            for ts in timestamps:
-                # Generate realistic occupancy pattern
-                hour = ts.hour
-                day_of_week = ts.dayofweek
-
-                # Base pattern: higher during weekday work hours
-                if day_of_week < 5:  # Weekday
-                    if 8 <= hour <= 17:
-                        base = 70 + np.random.normal(0, 10)
-                    elif 7 <= hour <= 20:
-                        base = 50 + np.random.normal(0, 10)
-                    else:
-                        base = 20 + np.random.normal(0, 5)
-                else:  # Weekend
-                    base = 25 + np.random.normal(0, 8)
-
-                occupancy = np.clip(base, 0, 100)
-
-                records.append({
-                    "timestamp": ts,
-                    "lot_id": lot,
-                    "occupancy": occupancy,
-                    "total_spots": 100,
-                    "available_spots": int(100 * (1 - occupancy / 100)),
-                })
-
-        return pd.DataFrame(records)
+        timestamps = pd.date_range(start, end, freq="15min")
+
+        # Base pattern: higher during weekday work hours. It depends only on
+        # the timestamp, so it is computed once and tiled across lots.
+        hour = timestamps.hour.to_numpy()
+        is_weekday = timestamps.dayofweek.to_numpy() < 5
+        peak = is_weekday & (hour >= 8) & (hour <= 17)
+        shoulder = is_weekday & ~peak & (hour >= 7) & (hour <= 20)
+        off_hours = is_weekday & ~peak & ~shoulder
+
+        base_per_ts = np.select([peak, shoulder, off_hours], [70, 50, 20], default=25)  # Weekend: 25
+        std_per_ts = np.select([peak, shoulder, off_hours], [10, 10, 5], default=8)
+
+        # One row per (lot, timestamp), lot-major
+        ts = np.tile(timestamps, len(lots))
+        n = len(ts)
+        base = np.tile(base_per_ts, len(lots))
+        std = np.tile(std_per_ts, len(lots))
+        occupancy = np.empty(n, dtype=np.float32)
+        np.clip(base + rng.normal(0, std, n), 0, 100, out=occupancy)
+
+        # Same column types as OCCUPANCY_SCHEMA; lot_id is built from codes
+        # so no per-row string array is materialized
+        lot_codes = np.repeat(np.arange(len(lots), dtype=np.int16), len(timestamps))
+
+        return pd.DataFrame({
+            "timestamp": ts,
+            "lot_id": pd.Categorical.from_codes(lot_codes, categories=lots),
+            "occupancy": occupancy,
+            "total_spots": np.full(n, 100, dtype=np.int32),
+            "available_spots": (100 - occupancy).astype(np.int32),
+        })
 
     def _generate_sample_weather_data(
         self,
@@ -408,29 +866,32 @@ class DataLoader:
         end_date: str,
     ) -> pd.DataFrame:
         """Generate sample weather data for testing."""
-        import numpy as np
-
+        rng = np.random.default_rng(self.config.random_seed)
         start = pd.to_datetime(start_date)
         end = pd.to_datetime(end_date)
-        timestamps = pd.date_range(start, end, freq="1H")
-
-        records = []
-        for ts in timestamps:
-            # Seasonal temperature variation
-            day_of_year = ts.dayofyear
-            seasonal = 20 * np.sin(2 * np.pi * (day_of_year - 80) / 365)
-            temp = 65 + seasonal + np.random.normal(0, 5)
-
-            records.append({
-                "timestamp": ts,
-                "temperature": temp,
-                "precipitation": max(0, np.random.exponential(0.05)),
-                "wind_speed": max(0, 8 + np.random.normal(0, 3)),
-                "humidity": np.clip(50 + np.random.normal(0, 15), 20, 100),
-                "conditions": "Clear" if np.random.random() > 0.3 else "Cloudy",
-            })
-
-        return pd.DataFrame(records)
+        timestamps = pd.date_range(start, end, freq="1h")
+        n = len(timestamps)
+
+        # Seasonal temperature variation
+        day_of_year = timestamps.dayofyear.to_numpy()
+        seasonal = 20 * np.sin(2 * np.pi * (day_of_year - 80) / 365)
+
+        temperature = (65 + seasonal + rng.normal(0, 5, n)).astype(np.float32)
+        precipitation = np.maximum(0, rng.exponential(0.05, n)).astype(np.float32)
+        wind_speed = np.maximum(0, 8 + rng.normal(0, 3, n)).astype(np.float32)
+        humidity = np.clip(50 + rng.normal(0, 15, n), 20, 100).astype(np.float32)
+        is_clear = rng.random(n) > 0.3
+
+        return pd.DataFrame({
+            "timestamp": timestamps,
+            "temperature": temperature,
+            "precipitation": precipitation,
+            "wind_speed": wind_speed,
+            "humidity": humidity,
+            "conditions": pd.Categorical.from_codes(
+                is_clear.astype(np.int8), categories=["Cloudy", "Clear"]
+            ),
+        })
 
     def _generate_sample_events_data(
         self,
@@ -438,44 +899,50 @@ class DataLoader:
         end_date: str,
     ) -> pd.DataFrame:
         """Generate sample events data for testing."""
-        import numpy as np
-
+        rng = np.random.default_rng(self.config.random_seed)
         start = pd.to_datetime(start_date)
         end = pd.to_datetime(end_date)
 
-        records = []
-        current = start
-
-        while current <= end:
-            # Football games on Saturdays during fall
-            if current.dayofweek == 5 and 9 <= current.month <= 11:
-                if np.random.random() > 0.5:  # ~50% of Saturdays
-                    records.append({
-                        "date": current,
-                        "event_type": "football_game",
-                        "name": "Football Game",
-                        "expected_attendance": np.random.randint(40000, 65000),
-                        "venue": "Stadium",
-                        "start_time": "14:00",
-                        "end_time": "18:00",
-                    })
-
-            # Basketball games
-            if current.dayofweek in [2, 5] and (current.month >= 11 or current.month <= 3):
-                if np.random.random() > 0.7:
-                    records.append({
-                        "date": current,
-                        "event_type": "basketball_game",
-                        "name": "Basketball Game",
-                        "expected_attendance": np.random.randint(10000, 16000),
-                        "venue": "Arena",
-                        "start_time": "19:00",
-                        "end_time": "21:30",
-                    })
-
-            current += timedelta(days=1)
-
-        return pd.DataFrame(records)
+        days = pd.date_range(start, end, freq="D")
+        day_of_week = days.dayofweek.to_numpy()
+        month = days.month.to_numpy()
+
+        # Football games on ~50% of fall Saturdays
+        football = (day_of_week == 5) & (month >= 9) & (month <= 11) & (rng.random(len(days)) > 0.5)
+
+        # Basketball games on ~30% of winter Wednesdays and Saturdays
+        basketball = (
+            np.isin(day_of_week, [2, 5])
+            & ((month >= 11) | (month <= 3))
+            & (rng.random(len(days)) > 0.7)
+        )
+
+        n_football = int(football.sum())
+        n_basketball = int(basketball.sum())
+
+        football_df = pd.DataFrame({
+            "date": days[football],
+            "event_type": "football_game",
+            "name": "Football Game",
+            "expected_attendance": rng.integers(40000, 65000, n_football, dtype=np.int32),
+            "venue": "Stadium",
+            "start_time": "14:00",
+            "end_time": "18:00",
+        })
+        basketball_df = pd.DataFrame({
+            "date": days[basketball],
+            "event_type": "basketball_game",
+            "name": "Basketball Game",
+            "expected_attendance": rng.integers(10000, 16000, n_basketball, dtype=np.int32),
+            "venue": "Arena",
+            "start_time": "19:00",
+            "end_time": "21:30",
+        })
+
+        # Interleave by date; on shared days the football game stays first
+        return pd.concat([football_df, basketball_df], ignore_index=True).sort_values(
+            "date", kind="stable", ignore_index=True
+        )
 
     def _generate_sample_lot_metadata(self) -> pd.DataFrame:
         """Generate sample lot metadata."""
@@ -9,17 +9,199 @@ Transforms raw data into features suitable for ML models:
 - Real-time features from user reports
 """
 
+import functools
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 from ml.training.config import FeatureConfig
 
+# Optional: numba-compiled rolling aggregations and feature kernels
+try:
+    import numba  # noqa: F401
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 logger = logging.getLogger(__name__)
 
+# pandas runs rolling aggregations through numba when it is installed
+ROLLING_ENGINE = "numba" if HAS_NUMBA else "cython"
+ROLLING_ENGINE_KWARGS = {"nopython": True, "nogil": True, "parallel": True} if HAS_NUMBA else None
+prange = numba.prange if HAS_NUMBA else range
+
+# Threads used to build independent feature groups concurrently
+FEATURE_WORKERS = 4
+
+# Bump whenever FeatureEngineer output changes, so cached features are rebuilt
+FEATURES_VERSION = 1
+PARALLEL_MIN_ROWS = 10_000
+
+# Cyclical encodings of the calendar columns only take a few hundred distinct
+# values, so sin/cos are tabulated once per period (day of year uses a 365-day
+# cycle and month a 12-month cycle, indexed by their 1-based values)
+_CYCLICAL_TABLES = {
+    name: (np.sin(2 * np.pi * np.arange(size) / period), np.cos(2 * np.pi * np.arange(size) / period))
+    for name, size, period in [
+        ("hour", 24, 24),
+        ("minute", 60, 60),
+        ("day", 7, 7),
+        ("year", 367, 365),
+        ("month", 13, 12),
+    ]
+}
+
+# Time-of-day bucket by hour: 0 morning [6, 12), 1 afternoon [12, 18),
+# 2 evening [18, 22), 3 night [22, 6)
+_TIME_OF_DAY_BUCKET = np.array(
+    [3] * 6 + [0] * 6 + [1] * 6 + [2] * 4 + [3] * 2, dtype=np.uint8
+)
+
+# Narrowest integer type for each bounded calendar feature
+_CALENDAR_DTYPES = {
+    "year": np.int16,
+    "month": np.int8,
+    "day": np.int8,
+    "day_of_week": np.int8,
+    "day_of_year": np.int16,
+    "week_of_year": np.int8,
+    "hour": np.int8,
+    "minute": np.int8,
+    "semester_week": np.int8,
+}
+
+
+def _local_days(index: pd.DatetimeIndex) -> np.ndarray:
+    """Calendar day (in the index's own timezone) of each timestamp as datetime64[D]."""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.to_numpy().astype("datetime64[D]")
+
+
+def _civil_from_days(days: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Proleptic Gregorian (year, month, day) from days since 1970-01-01 (H. Hinnant's algorithm)."""
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def _days_from_civil_jan1(year: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 of January 1st of each year."""
+    y = year - 1
+    era = y // 400
+    yoe = y - era * 400
+    return era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + 306 - 719468
+
+
+def _civil_ymd(days: int) -> Tuple[int, int, int]:
+    """Scalar (year, month, day) from days since 1970-01-01, for the compiled kernel."""
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    month = mp + 3 if mp < 10 else mp - 9
+    return yoe + era * 400 + (1 if month <= 2 else 0), month, doy - (153 * mp + 2) // 5 + 1
+
+
+def _calendar_fields_loop(ns: np.ndarray, out: np.ndarray) -> None:
+    """Fill out[:, i] with the _CALENDAR_FIELDS of ns[i] in one pass (compiled when numba is available)."""
+    for i in prange(ns.shape[0]):
+        days = ns[i] // 86_400_000_000_000
+        minute_of_day = (ns[i] - days * 86_400_000_000_000) // 60_000_000_000
+        year, month, day = _civil_ymd(days)
+        day_of_week = (days + 3) % 7
+        thursday = days - day_of_week + 3
+        out[0, i] = year
+        out[1, i] = month
+        out[2, i] = day
+        out[3, i] = day_of_week
+        out[4, i] = days - _jan1_days(year) + 1
+        out[5, i] = (thursday - _jan1_days(_civil_ymd(thursday)[0])) // 7 + 1
+        out[6, i] = minute_of_day // 60
+        out[7, i] = minute_of_day % 60
+
+
+_CALENDAR_FIELDS = [
+    "year", "month", "day", "day_of_week", "day_of_year", "week_of_year", "hour", "minute",
+]
+
+# Scalar helpers the kernel calls; compiled alongside it when numba is available
+_jan1_days = _days_from_civil_jan1
+
+if HAS_NUMBA:
+    _civil_ymd = numba.njit(cache=True)(_civil_ymd)
+    _jan1_days = numba.njit(cache=True)(_days_from_civil_jan1)
+    _calendar_fields_kernel = numba.njit(cache=True, parallel=True)(_calendar_fields_loop)
+
+
+def _calendar_fields(index: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+    """
+    Calendar and clock fields of each timestamp (in the index's own timezone).
+
+    Everything is derived with integer arithmetic from one int64 view of the
+    wall-clock times instead of a separate DatetimeIndex accessor per field;
+    with numba installed a compiled kernel fills all fields in a single
+    parallel pass.
+    """
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    ns = index.as_unit("ns").asi8
+
+    if HAS_NUMBA:
+        out = np.empty((len(_CALENDAR_FIELDS), len(ns)), dtype=np.int32)
+        _calendar_fields_kernel(ns, out)
+        return dict(zip(_CALENDAR_FIELDS, out))
+
+    days, ns_of_day = np.divmod(ns, 86_400_000_000_000)
+    minute_of_day = ns_of_day // 60_000_000_000
+
+    year, month, day = _civil_from_days(days)
+    day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday; Monday=0
+    day_of_year = days - _days_from_civil_jan1(year) + 1
+
+    # ISO week: the week's Thursday decides which ISO year it belongs to
+    thursday = days - day_of_week + 3
+    week_of_year = (thursday - _days_from_civil_jan1(_civil_from_days(thursday)[0])) // 7 + 1
+
+    fields = {
+        "year": year,
+        "month": month,
+        "day": day,
+        "day_of_week": day_of_week,
+        "day_of_year": day_of_year,
+        "week_of_year": week_of_year,
+        "hour": minute_of_day // 60,
+        "minute": minute_of_day % 60,
+    }
+    return {name: values.astype(np.int32) for name, values in fields.items()}
+
+
+def _iter_code_groups(codes: np.ndarray, n_codes: int) -> Iterator[np.ndarray]:
+    """
+    Lazily yield the row positions of each integer code in [0, n_codes).
+
+    One stable argsort and its group offsets are computed up front; each
+    group is then a slice of that order, so nothing per group is built until
+    it is consumed. Negative codes (no lot) are dropped.
+    """
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(n_codes + 1))
+    for i in range(n_codes):
+        yield order[bounds[i]:bounds[i + 1]]
+
 
 class FeatureEngineer:
     """
@@ -39,6 +221,9 @@ class FeatureEngineer:
         self.config = config or FeatureConfig()
         self._fitted = False
         self._feature_stats: Dict[str, Dict[str, float]] = {}
+        self._semester_start_cache: Dict[int, Tuple[np.datetime64, np.datetime64]] = {}
+        self._plan: Optional[Dict[str, Any]] = None
+        self._plan_key: Optional[str] = None
 
     def fit(self, df: pd.DataFrame) -> "FeatureEngineer":
         """
@@ -66,8 +251,56 @@ class FeatureEngineer:
             }
 
         self._fitted = True
+        self._plan = None
         return self
 
+    def _transform_plan(self) -> Dict[str, Any]:
+        """
+        Constants transform needs that depend only on the config and fit.
+
+        The enabled cyclical encodings, rolling windows, lag columns and their
+        aliases, event-type columns and missing-value fill defaults are
+        resolved once and reused by every transform call, so small repeated
+        calls (online inference) skip re-deriving them. The plan is rebuilt
+        after fit or when the config changes.
+        """
+        key = repr(self.config)
+        if self._plan is not None and self._plan_key == key:
+            return self._plan
+
+        cyclical = []
+        if self.config.use_cyclical_encoding:
+            for name, col in [
+                ("hour", "hour"),
+                ("minute", "minute"),
+                ("day", "day_of_week"),
+                ("year", "day_of_year"),
+                ("month", "month"),
+            ]:
+                sin_table, cos_table = _CYCLICAL_TABLES[name]
+                cyclical.append((col, f"{name}_sin", sin_table, f"{name}_cos", cos_table))
+
+        # Name lags more intuitively
+        lag_names = {
+            4: "lag_1h",    # 4 * 15min = 1 hour
+            96: "lag_24h",  # 96 * 15min = 24 hours
+            672: "lag_168h", # 672 * 15min = 1 week
+        }
+        lag_periods = list(self.config.lag_periods)
+        event_types = list(self.config.event_types)
+
+        self._plan = {
+            "cyclical": cyclical,
+            "rolling_windows": list(self.config.rolling_windows),
+            "lags": [(lag, f"lag_{lag}") for lag in lag_periods],
+            "lag_aliases": [(f"lag_{lag}", name) for lag, name in lag_names.items() if lag in lag_periods],
+            "event_types": pd.Index(event_types),
+            "event_columns": [f"is_{event_type.replace('_game', '_day')}" for event_type in event_types],
+            "fill_values": {col: stats["mean"] for col, stats in self._feature_stats.items()},
+        }
+        self._plan_key = key
+        return self._plan
+
     def transform(
         self,
         df: pd.DataFrame,
@@ -93,32 +326,81 @@ class FeatureEngineer:
         logger.info(f"Transforming {len(df)} samples")
 
         # Ensure datetime index
-        df = df.copy()
         if "timestamp" in df.columns:
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df = df.set_index("timestamp")
-
-        # Add all feature groups
-        df = self._add_temporal_features(df)
-        df = self._add_cyclical_features(df)
-        df = self._add_semester_features(df)
-        df = self._add_historical_features(df)
-        df = self._add_lag_features(df)
+            index = pd.DatetimeIndex(pd.to_datetime(df["timestamp"]), name="timestamp")
+        else:
+            index = df.index
+
+        # Sort by time once to ensure correct rolling calculations
+        order = None
+        if not index.is_monotonic_increasing:
+            order = np.argsort(index.asi8, kind="stable")
+            index = index[order]
+
+        # Features are collected as arrays keyed by column name and assembled
+        # into a single frame at the end, instead of growing a DataFrame
+        # column by column
+        feats: Dict[str, Any] = {}
+        input_columns = list(df.columns)
+        for col in df.columns:
+            if col == "timestamp":
+                continue
+            values = df[col].to_numpy() if isinstance(df[col].dtype, np.dtype) else df[col].array
+            feats[col] = values if order is None else values.take(order)
+
+        # Lots are carried as a categorical so every per-lot step below works
+        # on its integer codes instead of hashing lot id strings
+        if "lot_id" in feats and not isinstance(feats["lot_id"], pd.Categorical):
+            feats["lot_id"] = pd.Categorical(feats["lot_id"])
+
+        # Add all feature groups. Calendar fields come first since the other
+        # groups read them; the rest write disjoint columns, so each runs on
+        # its own shallow copy of feats in a worker thread (the heavy lifting
+        # is numpy/pandas, which release the GIL) and the new columns are
+        # merged back in submission order.
+        self._add_temporal_features(index, feats)
+
+        groups: List[Callable[[Dict[str, Any]], None]] = [
+            functools.partial(self._add_cyclical_features, index),
+            functools.partial(self._add_semester_features, index),
+            functools.partial(self._add_historical_features, index),
+            functools.partial(self._add_lag_features, index),
+        ]
 
         if weather_data is not None:
-            df = self._add_weather_features(df, weather_data)
+            groups.append(functools.partial(self._add_weather_features, index, weather_data=weather_data))
         else:
-            df = self._add_default_weather_features(df)
+            groups.append(functools.partial(self._add_default_weather_features, index))
 
         if events_data is not None:
-            df = self._add_event_features(df, events_data)
+            groups.append(functools.partial(self._add_event_features, index, events_data=events_data))
         else:
-            df = self._add_default_event_features(df)
+            groups.append(functools.partial(self._add_default_event_features, index))
 
         if reports_data is not None:
-            df = self._add_realtime_features(df, reports_data)
+            groups.append(functools.partial(self._add_realtime_features, index, reports_data=reports_data))
         else:
-            df = self._add_default_realtime_features(df)
+            groups.append(functools.partial(self._add_default_realtime_features, index))
+
+        def run_group(add: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+            group = dict(feats)
+            add(group)
+            return {key: values for key, values in group.items() if feats.get(key) is not values}
+
+        # Small batches (online inference) are built inline: thread start-up
+        # would cost more than the groups themselves
+        if len(index) < PARALLEL_MIN_ROWS:
+            for add in groups:
+                add(feats)
+        else:
+            with ThreadPoolExecutor(max_workers=FEATURE_WORKERS) as executor:
+                for added in list(executor.map(run_group, groups)):
+                    feats.update(added)
+
+        # Store generated features compactly; input columns keep their dtypes
+        self._downcast_features(feats, skip=input_columns)
+
+        df = pd.DataFrame(feats, index=index)
 
         # Handle missing values
         df = self._handle_missing_values(df)
@@ -139,402 +421,471 @@ class FeatureEngineer:
         """Fit and transform in one step."""
         return self.fit(df).transform(df, weather_data, events_data, reports_data)
 
-    def _add_temporal_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_temporal_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add basic temporal features from timestamp index."""
-        df["year"] = df.index.year
-        df["month"] = df.index.month
-        df["day"] = df.index.day
-        df["day_of_week"] = df.index.dayofweek
-        df["day_of_year"] = df.index.dayofyear
-        df["week_of_year"] = df.index.isocalendar().week.astype(int)
-        df["hour"] = df.index.hour
-        df["minute"] = df.index.minute
-
-        # Time of day categories
-        df["is_morning"] = (df["hour"] >= 6) & (df["hour"] < 12)
-        df["is_afternoon"] = (df["hour"] >= 12) & (df["hour"] < 18)
-        df["is_evening"] = (df["hour"] >= 18) & (df["hour"] < 22)
-        df["is_night"] = (df["hour"] >= 22) | (df["hour"] < 6)
+        feats.update(_calendar_fields(index))
 
-        # Weekend indicator
-        df["is_weekend"] = df["day_of_week"] >= 5
+        # Time of day categories, from one bucket lookup per row
+        bucket = _TIME_OF_DAY_BUCKET[feats["hour"]]
+        for k, name in enumerate(["is_morning", "is_afternoon", "is_evening", "is_night"]):
+            feats[name] = bucket == k
 
-        return df
+        # Weekend indicator
+        feats["is_weekend"] = feats["day_of_week"] >= 5
 
-    def _add_cyclical_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_cyclical_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add cyclical encodings for periodic features."""
-        if not self.config.use_cyclical_encoding:
-            return df
+        # Each enabled encoding is a table lookup on the integer calendar column
+        for col, sin_name, sin_table, cos_name, cos_table in self._transform_plan()["cyclical"]:
+            values = feats[col]
+            feats[sin_name] = sin_table[values]
+            feats[cos_name] = cos_table[values]
 
-        # Hour of day (24-hour cycle)
-        hour_rad = 2 * np.pi * df["hour"] / 24
-        df["hour_sin"] = np.sin(hour_rad)
-        df["hour_cos"] = np.cos(hour_rad)
-
-        # Minute within hour (60-minute cycle)
-        minute_rad = 2 * np.pi * df["minute"] / 60
-        df["minute_sin"] = np.sin(minute_rad)
-        df["minute_cos"] = np.cos(minute_rad)
-
-        # Day of week (7-day cycle)
-        day_rad = 2 * np.pi * df["day_of_week"] / 7
-        df["day_sin"] = np.sin(day_rad)
-        df["day_cos"] = np.cos(day_rad)
-
-        # Day of year (365-day cycle)
-        year_rad = 2 * np.pi * df["day_of_year"] / 365
-        df["year_sin"] = np.sin(year_rad)
-        df["year_cos"] = np.cos(year_rad)
-
-        # Month (12-month cycle)
-        month_rad = 2 * np.pi * df["month"] / 12
-        df["month_sin"] = np.sin(month_rad)
-        df["month_cos"] = np.cos(month_rad)
-
-        return df
-
-    def _add_semester_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_semester_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add academic semester-related features."""
         # Determine if date is during semester
         # Fall: Aug 15 - Dec 15, Spring: Jan 15 - May 15
-        month = df["month"]
-        day = df["day"]
+        month = feats["month"]
+        day = feats["day"]
 
-        df["is_fall_semester"] = (
+        is_fall = (
             ((month == 8) & (day >= 15))
-            | (month.isin([9, 10, 11]))
+            | np.isin(month, [9, 10, 11])
             | ((month == 12) & (day <= 15))
         )
-
-        df["is_spring_semester"] = (
+        is_spring = (
             ((month == 1) & (day >= 15))
-            | (month.isin([2, 3, 4]))
+            | np.isin(month, [2, 3, 4])
             | ((month == 5) & (day <= 15))
         )
-
-        df["is_summer"] = ~(df["is_fall_semester"] | df["is_spring_semester"])
-
-        # Week within semester (approximate)
-        def get_semester_week(row):
-            if row["is_fall_semester"]:
-                # Fall starts around Aug 20
-                semester_start = pd.Timestamp(year=row.name.year, month=8, day=20)
-            elif row["is_spring_semester"]:
-                # Spring starts around Jan 15
-                semester_start = pd.Timestamp(year=row.name.year, month=1, day=15)
-            else:
-                return 0
-
-            days_since_start = (row.name - semester_start).days
-            return max(0, min(16, days_since_start // 7 + 1))
-
-        df["semester_week"] = df.apply(get_semester_week, axis=1)
+        feats["is_fall_semester"] = is_fall
+        feats["is_spring_semester"] = is_spring
+        feats["is_summer"] = ~(is_fall | is_spring)
+
+        # Week within semester (approximate): fall starts around Aug 20,
+        # spring around Jan 15; computed on local calendar days. Start dates
+        # depend only on the year and are cached across transform calls.
+        days = _local_days(index)
+        years, year_pos = np.unique(feats["year"], return_inverse=True)
+        for year in years.tolist():
+            if year not in self._semester_start_cache:
+                self._semester_start_cache[year] = (
+                    np.datetime64(f"{year:04d}-08-20"),
+                    np.datetime64(f"{year:04d}-01-15"),
+                )
+        starts = np.array(
+            [self._semester_start_cache[year] for year in years.tolist()],
+            dtype="datetime64[D]",
+        ).reshape(-1, 2)
+        fall_start = starts[year_pos, 0]
+        spring_start = starts[year_pos, 1]
+
+        semester_start = np.where(is_fall, fall_start, spring_start)
+        days_since_start = (days - semester_start).astype(np.int64)
+        semester_week = np.clip(days_since_start // 7 + 1, 0, 16)
+        semester_week = np.where(is_fall | is_spring, semester_week, 0)
+        feats["semester_week"] = semester_week
 
         # Finals week detection (weeks 15-16 of semester)
-        df["is_finals"] = df["semester_week"].isin([15, 16])
+        feats["is_finals"] = np.isin(semester_week, [15, 16])
 
         # Dead week (week before finals)
-        df["is_dead_week"] = df["semester_week"] == 14
+        feats["is_dead_week"] = semester_week == 14
 
         # First week of semester
-        df["is_first_week"] = df["semester_week"] == 1
-
-        return df
+        feats["is_first_week"] = semester_week == 1
 
-    def _add_historical_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_historical_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add rolling historical averages."""
-        # Sort by time to ensure correct rolling calculations
-        df = df.sort_index()
-
-        if "occupancy" not in df.columns:
-            return df
+        if "occupancy" not in feats:
+            return
 
-        # Group by lot if multiple lots
-        if "lot_id" in df.columns:
-            grouped = df.groupby("lot_id")["occupancy"]
-        else:
-            grouped = df["occupancy"]
+        # Group once; every rolling window below reuses the same grouper
+        grouped, order = self._group_occupancy_by_lot(feats)
 
         # Rolling averages (window sizes in 15-min intervals)
-        for window in self.config.rolling_windows:
-            col_name = f"rolling_{window}_avg"
-            if "lot_id" in df.columns:
-                df[col_name] = grouped.transform(
-                    lambda x: x.rolling(window, min_periods=1).mean()
-                )
-            else:
-                df[col_name] = grouped.rolling(window, min_periods=1).mean()
+        for window in self._transform_plan()["rolling_windows"]:
+            feats[f"rolling_{window}_avg"] = self._rolling_occupancy(grouped, order, window, "mean")
 
         # Same day of week average (last N weeks)
-        df["last_30_same_day_avg"] = self._compute_same_day_avg(df, weeks=4)
+        feats["last_30_same_day_avg"] = self._compute_same_day_avg(index, feats, weeks=4)
 
-        # Rolling standard deviation for uncertainty
-        df["rolling_24h_std"] = grouped.transform(
-            lambda x: x.rolling(96, min_periods=1).std()  # 24 hours
-        ) if "lot_id" in df.columns else df["occupancy"].rolling(96, min_periods=1).std()
+        # Rolling standard deviation for uncertainty (24 hours)
+        feats["rolling_24h_std"] = self._rolling_occupancy(grouped, order, 96, "std")
 
-        return df
+    def _group_occupancy_by_lot(self, feats: Dict[str, Any]) -> Tuple[Any, Optional[np.ndarray]]:
+        """
+        Group occupancy by lot for rolling aggregation.
+
+        Rows are ordered by lot first so grouped results come back in a known
+        order and can be scattered to the original rows, since the timestamp
+        index repeats across lots.
+
+        Returns:
+            Tuple of (grouped occupancy, or the plain Series without lot_id;
+            row order of the grouped values, or None)
+        """
+        occupancy = np.asarray(feats["occupancy"])
+        if "lot_id" not in feats:
+            return pd.Series(occupancy), None
+
+        lot = feats["lot_id"].codes
+        order = np.argsort(lot, kind="stable")
+        grouped = pd.Series(occupancy[order]).groupby(lot[order], sort=True)
+        return grouped, order
+
+    def _rolling_occupancy(
+        self,
+        grouped: Any,
+        order: Optional[np.ndarray],
+        window: int,
+        agg: str,
+    ) -> np.ndarray:
+        """Trailing rolling aggregate (GroupBy.rolling, no per-group Python) in original row order."""
+        rolling = grouped.rolling(window, min_periods=1)
+        values = getattr(rolling, agg)(
+            engine=ROLLING_ENGINE, engine_kwargs=ROLLING_ENGINE_KWARGS
+        ).to_numpy()
+
+        if order is None:
+            return values
+
+        result = np.empty(len(values))
+        result[order] = values
+        return result
 
     def _compute_same_day_avg(
         self,
-        df: pd.DataFrame,
+        index: pd.DatetimeIndex,
+        feats: Dict[str, Any],
         weeks: int = 4,
-    ) -> pd.Series:
+    ) -> np.ndarray:
         """
         Compute average occupancy for same day/hour over past weeks.
 
+        Rows are bucketed by (lot, day of week, hour); each row averages its
+        bucket's earlier observations within the look-back window in a single
+        time-based groupby-rolling pass.
+
         Args:
-            df: DataFrame with occupancy data
+            index: Timestamp of each row
+            feats: Feature arrays with occupancy data
             weeks: Number of weeks to look back
 
         Returns:
-            Series with same-day averages
+            Array with same-day averages
         """
-        result = pd.Series(index=df.index, dtype=float)
-
-        for idx in df.index:
-            # Get same day of week at same hour
-            mask = (
-                (df.index.dayofweek == idx.dayofweek)
-                & (df.index.hour == idx.hour)
-                & (df.index < idx)
-                & (df.index >= idx - timedelta(weeks=weeks))
-            )
-
-            if mask.any() and "occupancy" in df.columns:
-                result[idx] = df.loc[mask, "occupancy"].mean()
-            else:
-                result[idx] = np.nan
+        if "occupancy" not in feats:
+            return np.full(len(index), np.nan)
 
+        slot = feats["day_of_week"] * 24 + feats["hour"]
+        if "lot_id" in feats:
+            lot = feats["lot_id"].codes
+        else:
+            lot = np.zeros(len(index), dtype=np.int64)
+
+        # Sort by (lot, slot, time) so groupby(sort=True).rolling returns rows
+        # in exactly this order and the result can be scattered back
+        order = np.lexsort((index.asi8, slot, lot))
+        buckets = pd.DataFrame({
+            "lot": lot[order],
+            "slot": slot[order],
+            "timestamp": index[order],
+            "occupancy": np.asarray(feats["occupancy"])[order],
+        })
+        means = buckets.groupby(["lot", "slot"], sort=True).rolling(
+            f"{weeks * 7}D", on="timestamp", closed="left"
+        )["occupancy"].mean()
+
+        result = np.empty(len(index))
+        result[order] = means.to_numpy()
         return result
 
-    def _add_lag_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_lag_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add lagged occupancy values as features."""
-        if "occupancy" not in df.columns:
-            return df
+        if "occupancy" not in feats:
+            return
+
+        # All lags come from one lot-ordered copy of occupancy: a row's lag-k
+        # value is k rows back, provided that row is still in the same lot
+        n = len(index)
+        occupancy = np.asarray(feats["occupancy"])
+        if "lot_id" in feats:
+            lot = feats["lot_id"].codes
+            order = np.argsort(lot, kind="stable")
+            sorted_lot = lot[order]
+        else:
+            order = np.arange(n)
+            sorted_lot = np.zeros(n, dtype=np.int64)
+        sorted_occupancy = occupancy[order]
 
-        for lag in self.config.lag_periods:
-            col_name = f"lag_{lag}"
-            if "lot_id" in df.columns:
-                df[col_name] = df.groupby("lot_id")["occupancy"].shift(lag)
-            else:
-                df[col_name] = df["occupancy"].shift(lag)
+        group_start = np.flatnonzero(np.r_[True, sorted_lot[1:] != sorted_lot[:-1]])
+        group_size = np.diff(np.r_[group_start, n])
+        position = np.arange(n) - np.repeat(group_start, group_size)
 
-        # Name lags more intuitively
-        lag_names = {
-            4: "lag_1h",    # 4 * 15min = 1 hour
-            96: "lag_24h",  # 96 * 15min = 24 hours
-            672: "lag_168h", # 672 * 15min = 1 week
-        }
-        for lag, name in lag_names.items():
-            if f"lag_{lag}" in df.columns:
-                df[name] = df[f"lag_{lag}"]
+        plan = self._transform_plan()
+        lag_dtype = np.promote_types(occupancy.dtype, np.float32)
+        for lag, col in plan["lags"]:
+            lagged = np.full(n, np.nan, dtype=lag_dtype)
+            valid = np.flatnonzero(position >= lag)
+            lagged[order[valid]] = sorted_occupancy[valid - lag]
+            feats[col] = lagged
 
-        return df
+        for col, name in plan["lag_aliases"]:
+            feats[name] = feats[col]
 
     def _add_weather_features(
         self,
-        df: pd.DataFrame,
+        index: pd.DatetimeIndex,
+        feats: Dict[str, Any],
         weather_data: pd.DataFrame,
-    ) -> pd.DataFrame:
+    ) -> None:
         """
         Add weather features from external data.
 
         Args:
-            df: Main DataFrame
+            index: Timestamp of each row
+            feats: Feature arrays to add to
             weather_data: Weather DataFrame with columns:
                 - timestamp: datetime
                 - temperature: degrees Fahrenheit
                 - precipitation: inches
                 - wind_speed: mph
-
-        Returns:
-            DataFrame with weather features
         """
-        # Ensure weather data is indexed by timestamp
-        weather = weather_data.copy()
-        if "timestamp" in weather.columns:
-            weather["timestamp"] = pd.to_datetime(weather["timestamp"])
-            weather = weather.set_index("timestamp")
-
-        # Resample to 15-min intervals if needed
-        weather = weather.resample("15T").ffill()
-
-        # Merge with main data
-        for col in ["temperature", "precipitation", "wind_speed"]:
-            if col in weather.columns:
-                df[col] = weather[col].reindex(df.index, method="nearest")
+        # Match each row to its nearest weather reading in one sorted merge;
+        # rows with no reading within the tolerance are left missing
+        if "timestamp" in weather_data.columns:
+            times = pd.DatetimeIndex(pd.to_datetime(weather_data["timestamp"]))
+        else:
+            times = pd.DatetimeIndex(weather_data.index)
+        cols = [
+            col for col in ["temperature", "precipitation", "wind_speed"]
+            if col in weather_data.columns
+        ]
+        weather = pd.DataFrame(
+            {col: weather_data[col].to_numpy() for col in cols},
+        ).assign(timestamp=times.astype(index.dtype).to_numpy())
+        weather = weather.dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+
+        matched = pd.merge_asof(
+            pd.DataFrame({"timestamp": index}),
+            weather,
+            on="timestamp",
+            direction="nearest",
+            tolerance=pd.Timedelta(minutes=self.config.weather_match_tolerance_minutes),
+        )
+        for col in cols:
+            feats[col] = matched[col].to_numpy()
 
         # Derived weather features
-        if "temperature" in df.columns:
+        if "temperature" in feats:
             # Extreme temperature indicators
-            df["is_hot"] = df["temperature"] > 90
-            df["is_cold"] = df["temperature"] < 40
-
-        if "precipitation" in df.columns:
-            df["is_raining"] = df["precipitation"] > 0.01
+            feats["is_hot"] = feats["temperature"] > 90
+            feats["is_cold"] = feats["temperature"] < 40
 
-        return df
+        if "precipitation" in feats:
+            feats["is_raining"] = feats["precipitation"] > 0.01
 
-    def _add_default_weather_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_default_weather_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add placeholder weather features when no data available."""
-        df["temperature"] = 70.0  # Default mild temperature
-        df["precipitation"] = 0.0
-        df["wind_speed"] = 5.0
-        df["is_hot"] = False
-        df["is_cold"] = False
-        df["is_raining"] = False
-        return df
+        feats["temperature"] = 70.0  # Default mild temperature
+        feats["precipitation"] = 0.0
+        feats["wind_speed"] = 5.0
+        feats["is_hot"] = False
+        feats["is_cold"] = False
+        feats["is_raining"] = False
 
     def _add_event_features(
         self,
-        df: pd.DataFrame,
+        index: pd.DatetimeIndex,
+        feats: Dict[str, Any],
         events_data: pd.DataFrame,
-    ) -> pd.DataFrame:
+    ) -> None:
         """
         Add event-related features.
 
         Args:
-            df: Main DataFrame
+            index: Timestamp of each row
+            feats: Feature arrays to add to
             events_data: Events DataFrame with columns:
                 - date: event date
                 - event_type: type of event
                 - expected_attendance: optional attendance estimate
-
-        Returns:
-            DataFrame with event features
         """
-        events = events_data.copy()
-        if "date" in events.columns:
-            events["date"] = pd.to_datetime(events["date"]).dt.date
-
-        df_dates = df.index.date
+        row_days = _local_days(index)
+        plan = self._transform_plan()
+        event_types = plan["event_types"]
+
+        # One flag column per configured event type, filled in a single
+        # gather: each distinct event day gets a row of type flags and every
+        # row looks up its own calendar day
+        flags = np.zeros((len(index), len(event_types)), dtype=bool, order="F")
+        event_days = np.array([], dtype="datetime64[D]")
+        if "date" in events_data.columns:
+            event_days = _local_days(pd.DatetimeIndex(pd.to_datetime(events_data["date"])))
+            type_codes = event_types.get_indexer(events_data["event_type"])
+            known = (type_codes >= 0) & ~np.isnat(event_days)
+
+            days, day_codes = np.unique(event_days[known], return_inverse=True)
+            day_flags = np.zeros((len(days), len(event_types)), dtype=bool)
+            day_flags[day_codes, type_codes[known]] = True
+
+            if len(days):
+                pos = np.minimum(np.searchsorted(days, row_days), len(days) - 1)
+                hit = days[pos] == row_days
+                flags[hit] = day_flags[pos[hit]]
 
         # Event type indicators
-        for event_type in self.config.event_types:
-            col_name = f"is_{event_type.replace('_game', '_day')}"
-            event_dates = events[events["event_type"] == event_type]["date"].values
-            df[col_name] = np.isin(df_dates, event_dates)
-
-        # Simplified indicators
-        df["is_game_day"] = (
-            df.get("is_football_day", False) | df.get("is_basketball_day", False)
+        for k, col in enumerate(plan["event_columns"]):
+            feats[col] = flags[:, k]
+
+        # Simplified indicators; event types missing from the config count
+        # as never happening
+        no_event = np.zeros(len(index), dtype=bool)
+        feats["is_game_day"] = (
+            (feats["is_football_day"] if "is_football_day" in feats else no_event)
+            | (feats["is_basketball_day"] if "is_basketball_day" in feats else no_event)
         )
-        df["is_concert"] = df.get("is_concert_day", df.get("is_concert", False))
+        if "is_concert_day" in feats:
+            feats["is_concert"] = feats["is_concert_day"]
+        elif "is_concert" not in feats:
+            feats["is_concert"] = no_event
 
         # Days until next event
-        df["days_until_event"] = self._compute_days_until_event(df, events)
-
-        return df
+        feats["days_until_event"] = self._compute_days_until_event(row_days, event_days)
 
     def _compute_days_until_event(
         self,
-        df: pd.DataFrame,
-        events: pd.DataFrame,
-    ) -> pd.Series:
+        row_days: np.ndarray,
+        event_days: np.ndarray,
+    ) -> np.ndarray:
         """Compute days until the next major event."""
-        result = pd.Series(index=df.index, dtype=float)
-
-        if "date" in events.columns:
-            event_dates = pd.to_datetime(events["date"]).sort_values()
+        result = np.full(len(row_days), float(self.config.event_lookahead_days))
 
-            for idx in df.index:
-                current_date = idx.date()
-                future_events = event_dates[event_dates.dt.date > current_date]
+        event_days = np.unique(event_days)
+        event_days = event_days[~np.isnat(event_days)]
 
-                if len(future_events) > 0:
-                    next_event = future_events.iloc[0]
-                    result[idx] = (next_event.date() - current_date).days
-                else:
-                    result[idx] = self.config.event_lookahead_days  # No upcoming events
+        # Next event strictly after each row's calendar day
+        pos = np.searchsorted(event_days, row_days, side="right")
+        has_next = pos < len(event_days)
+        result[has_next] = (event_days[pos[has_next]] - row_days[has_next]).astype(np.int64)
 
-        return result.fillna(self.config.event_lookahead_days)
+        return result
 
-    def _add_default_event_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_default_event_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add placeholder event features when no data available."""
-        df["is_game_day"] = False
-        df["is_concert"] = False
-        df["days_until_event"] = 7
-        return df
+        feats["is_game_day"] = False
+        feats["is_concert"] = False
+        feats["days_until_event"] = 7
 
     def _add_realtime_features(
         self,
-        df: pd.DataFrame,
+        index: pd.DatetimeIndex,
+        feats: Dict[str, Any],
         reports_data: pd.DataFrame,
-    ) -> pd.DataFrame:
+    ) -> None:
         """
         Add real-time features from user reports.
 
         Args:
-            df: Main DataFrame
+            index: Timestamp of each row
+            feats: Feature arrays to add to
             reports_data: User reports DataFrame with columns:
                 - timestamp: report time
                 - lot_id: parking lot
                 - reported_status: user-reported status
-
-        Returns:
-            DataFrame with real-time features
         """
         reports = reports_data.copy()
         if "timestamp" in reports.columns:
             reports["timestamp"] = pd.to_datetime(reports["timestamp"])
 
-        # Count reports in last hour
-        df["reports_last_hour"] = self._count_reports_in_window(
-            df, reports, window_minutes=60
-        )
-
-        # Count reports in last 15 minutes
-        df["reports_last_15min"] = self._count_reports_in_window(
-            df, reports, window_minutes=15
-        )
-
-        return df
+        # Count reports in the last hour and last 15 minutes
+        counts = self._count_reports_in_windows(index, feats, reports, window_minutes=[60, 15])
+        feats["reports_last_hour"] = counts[60]
+        feats["reports_last_15min"] = counts[15]
 
-    def _count_reports_in_window(
+    def _count_reports_in_windows(
         self,
-        df: pd.DataFrame,
+        index: pd.DatetimeIndex,
+        feats: Dict[str, Any],
         reports: pd.DataFrame,
-        window_minutes: int,
-    ) -> pd.Series:
-        """Count reports within a time window before each timestamp."""
-        result = pd.Series(index=df.index, dtype=int)
+        window_minutes: List[int],
+    ) -> Dict[int, np.ndarray]:
+        """
+        Count reports within time windows before each timestamp.
 
-        for idx in df.index:
-            window_start = idx - timedelta(minutes=window_minutes)
-            mask = (reports["timestamp"] > window_start) & (reports["timestamp"] <= idx)
+        Lots are streamed one at a time (when both sides have lot_id): each
+        lot's report times are sorted once and every window's (start, end]
+        range is located with searchsorted on that slice, so no rows x
+        reports intermediate is ever built.
 
-            if "lot_id" in df.columns and "lot_id" in reports.columns:
-                lot_id = df.loc[idx, "lot_id"] if idx in df.index else None
-                if lot_id:
-                    mask = mask & (reports["lot_id"] == lot_id)
+        Returns:
+            Dict mapping each window length in minutes to per-row counts
+        """
+        counts = {window: np.zeros(len(index), dtype=np.int64) for window in window_minutes}
+        if reports.empty or "timestamp" not in reports.columns:
+            return counts
+
+        row_times = index.values.astype("datetime64[ns]")
+        report_times = reports["timestamp"].values.astype("datetime64[ns]")
+
+        def count_into(rows: np.ndarray, times: np.ndarray) -> None:
+            times = np.sort(times)
+            times_at = row_times[rows]
+            end = np.searchsorted(times, times_at, side="right")
+            for window, window_counts in counts.items():
+                start = np.searchsorted(times, times_at - np.timedelta64(window, "m"), side="right")
+                window_counts[rows] = end - start
+
+        if "lot_id" in feats and "lot_id" in reports.columns:
+            lots = feats["lot_id"]
+            report_lots = lots.categories.get_indexer(reports["lot_id"])
+            row_groups = _iter_code_groups(lots.codes, len(lots.categories))
+            report_groups = _iter_code_groups(report_lots, len(lots.categories))
+            for rows, report_rows in zip(row_groups, report_groups):
+                if len(rows) and len(report_rows):
+                    count_into(rows, report_times[report_rows])
+        else:
+            count_into(np.arange(len(index)), report_times)
 
-            result[idx] = mask.sum()
+        return counts
 
-        return result
-
-    def _add_default_realtime_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_default_realtime_features(self, index: pd.DatetimeIndex, feats: Dict[str, Any]) -> None:
         """Add placeholder real-time features when no data available."""
-        df["reports_last_hour"] = 0
-        df["reports_last_15min"] = 0
-        df["geofence_entries"] = 0
-        return df
+        feats["reports_last_hour"] = 0
+        feats["reports_last_15min"] = 0
+        feats["geofence_entries"] = 0
 
     def _handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """Handle missing values in features."""
+        # Only columns that actually contain NaNs need filling; find them in one pass
+        na_cols = df.columns[df.isna().any().to_numpy()]
+        if na_cols.empty:
+            return df
+
         # Forward fill then backward fill for time-series continuity
-        df = df.ffill().bfill()
+        filled = df[na_cols].ffill().bfill()
 
         # Fill any remaining NaNs with column means or defaults
-        for col in df.columns:
-            if df[col].isna().any():
-                if col in self._feature_stats:
-                    df[col] = df[col].fillna(self._feature_stats[col]["mean"])
-                else:
-                    df[col] = df[col].fillna(0)
+        means = self._transform_plan()["fill_values"]
+        fill_values = {col: means.get(col, 0) for col in na_cols}
+        df[na_cols] = filled.fillna(fill_values)
 
         return df
 
+    def _downcast_features(self, feats: Dict[str, Any], skip: List[str]) -> None:
+        """Cast float features to float32 and bounded calendar ints to int8/int16."""
+        for col, values in feats.items():
+            if col in skip:
+                continue
+            if col in _CALENDAR_DTYPES:
+                dtype = _CALENDAR_DTYPES[col]
+            elif isinstance(values, float) or (isinstance(values, np.ndarray) and values.dtype == np.float64):
+                dtype = np.float32
+            else:
+                continue
+            feats[col] = values.astype(dtype) if isinstance(values, np.ndarray) else dtype(values)
+
     def get_feature_names(self) -> List[str]:
         """Get list of all feature names generated by this engineer."""
         return [
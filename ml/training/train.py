@@ -11,21 +11,37 @@ Orchestrates the complete training workflow:
 """
 
 import argparse
+import atexit
+import contextlib
+import functools
+import gzip
+import hashlib
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import mlflow
+import numpy as np
 import pandas as pd
 
 from ml.models.ensemble import EnsembleModel, EnsembleConfig
-from ml.models.temporal_fusion_transformer import TemporalFusionTransformerModel, TFTConfig
+from ml.models.temporal_fusion_transformer import (
+    TemporalFusionTransformerModel,
+    TFTConfig,
+    broadcast_object,
+    init_distributed,
+)
 from ml.models.lightgbm_model import LightGBMModel, LightGBMConfig
 from ml.training.config import TrainingConfig, load_config
 from ml.training.data_loader import DataLoader
-from ml.training.features import FeatureEngineer
+from ml.training.features import FEATURES_VERSION, FeatureEngineer
 from ml.utils.metrics import evaluate_predictions, MetricsCalculator
 
 # Configure logging
@@ -62,45 +78,77 @@ class Trainer:
 
         # Initialize MLflow
         mlflow.set_tracking_uri(self.config.mlflow_tracking_uri)
+        self._mlflow_client = mlflow.tracking.MlflowClient()
+
+        # Artifact uploads run in the background on a pool created on demand;
+        # anything still pending is flushed before the interpreter exits
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._pending_uploads: List[Future] = []
 
-    def run(self) -> Dict[str, Any]:
+    def run(self, wait_for_uploads: bool = False) -> Dict[str, Any]:
         """
         Execute the complete training pipeline.
 
+        Args:
+            wait_for_uploads: Block until MLflow artifact uploads finish
+                instead of leaving them to complete in the background
+
         Returns:
             Dictionary with training results and metrics
         """
         logger.info("Starting training pipeline")
         logger.info(f"Model type: {self.config.model.model_type}")
 
-        # Start MLflow run
-        with mlflow.start_run(run_name=self.config.training.run_name):
-            # Log configuration
-            mlflow.log_params(self._flatten_config())
+        # Under DDP every rank trains, but only rank 0 tracks, evaluates and saves
+        is_rank_zero = int(os.environ.get("RANK", 0)) == 0
 
-            # 1. Load data
-            logger.info("Loading training data...")
-            train_df, val_df, test_df = self._load_and_prepare_data()
+        # Serialized once, for the logged params and the returned results
+        config_dict = self.config.to_dict()
 
-            # 2. Engineer features
-            logger.info("Engineering features...")
-            X_train, y_train = self._prepare_features(train_df)
-            X_val, y_val = self._prepare_features(val_df)
-            X_test, y_test = self._prepare_features(test_df)
+        # Start MLflow run
+        run_context = (
+            mlflow.start_run(run_name=self.config.training.run_name)
+            if is_rank_zero else contextlib.nullcontext()
+        )
+        with run_context:
+            # Log configuration
+            if is_rank_zero:
+                mlflow.log_params(self._flatten_config(config_dict))
+
+            # Under DDP only rank 0 loads data and engineers features (and
+            # writes the feature cache); the other ranks receive its splits
+            distributed = self._uses_ddp() and init_distributed()
+            splits = None
+            if is_rank_zero or not distributed:
+                # 1. Load data
+                logger.info("Loading training data...")
+                train_df, val_df, test_df = self._load_and_prepare_data()
+
+                # 2. Engineer features
+                logger.info("Engineering features...")
+                if is_rank_zero:
+                    mlflow.log_param("feature_cache_key", self._feature_cache_key)
+                splits = self._prepare_features_combined(train_df, val_df, test_df)
+            if distributed:
+                splits = broadcast_object(splits)
+            (X_train, y_train), (X_val, y_val), (X_test, y_test) = splits
 
             # 3. Train model
             logger.info("Training model...")
             model = self._train_model(X_train, y_train, (X_val, y_val))
 
+            if not is_rank_zero:
+                return {"model_path": None, "metrics": {}, "config": config_dict}
+
             # 4. Evaluate model
             logger.info("Evaluating model...")
             metrics = self._evaluate_model(model, X_test, y_test)
-            mlflow.log_metrics(metrics)
+            mlflow.log_metrics({name: float(value) for name, value in metrics.items()})
 
             # 5. Save model
             logger.info("Saving model artifacts...")
             model_path = self._save_model(model)
-            mlflow.log_artifact(str(model_path))
+            self._log_artifact_async(model_path)
 
             # 6. Log feature importance
             if hasattr(model, "get_feature_importance"):
@@ -108,14 +156,24 @@ class Trainer:
                 if importance is not None:
                     self._log_feature_importance(importance)
 
+            if wait_for_uploads:
+                self.wait_for_uploads()
+
             logger.info("Training pipeline completed successfully")
 
             return {
                 "model_path": str(model_path),
                 "metrics": metrics,
-                "config": self.config.to_dict(),
+                "config": config_dict,
             }
 
+    def _uses_ddp(self) -> bool:
+        """Whether the selected model trains a TFT data-parallel under torchrun."""
+        return (
+            self.config.model.model_type in ("tft", "ensemble")
+            and self.config.model.tft_strategy in ("auto", "ddp")
+        )
+
     def _load_and_prepare_data(
         self,
     ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
@@ -135,20 +193,45 @@ class Trainer:
         self._events_df = events_df
         self._reports_df = reports_df
 
+        # Engineered features are cached per split under a key covering the
+        # feature code version, the data/feature settings and a content
+        # fingerprint of the loaded inputs (so corrected values invalidate it)
+        key = repr((
+            FEATURES_VERSION,
+            self.config.data.__dict__,
+            self.config.features.__dict__,
+            *(_frame_fingerprint(df) for df in (occupancy_df, weather_df, events_df, reports_df)),
+        ))
+        self._feature_cache_key = hashlib.sha256(key.encode()).hexdigest()[:32]
+
         return train_df, val_df, test_df
 
     def _prepare_features(
         self,
         df: pd.DataFrame,
+        split: Optional[str] = None,
     ) -> Tuple[pd.DataFrame, pd.Series]:
-        """Transform raw data into features."""
-        # Apply feature engineering
-        df_features = self.feature_engineer.transform(
-            df,
-            weather_data=self._weather_df,
-            events_data=self._events_df,
-            reports_data=self._reports_df,
-        )
+        """
+        Transform raw data into features.
+
+        When a split name is given, the engineered frame is read from (or
+        written to) the Parquet feature cache instead of being recomputed.
+        """
+        cache_path = self._feature_cache_path(split) if split and self.config.features.cache else None
+
+        if cache_path is not None and cache_path.exists():
+            logger.info(f"Loading cached {split} features from {cache_path}")
+            df_features = pd.read_parquet(cache_path, engine="pyarrow")
+        else:
+            # Apply feature engineering
+            df_features = self.feature_engineer.transform(
+                df,
+                weather_data=self._weather_df,
+                events_data=self._events_df,
+                reports_data=self._reports_df,
+            )
+            if cache_path is not None:
+                self._write_feature_cache(cache_path, df_features)
 
         # Separate features and target
         target_col = "occupancy"
@@ -157,8 +240,61 @@ class Trainer:
         X = df_features[feature_cols]
         y = df_features[target_col]
 
+        # Engineered features are already float32; this catches passthrough columns
+        if self.config.features.fp32:
+            float_cols = X.select_dtypes(include="float64").columns
+            if len(float_cols):
+                X = X.astype(dict.fromkeys(float_cols, np.float32))
+            y = y.astype(np.float32)
+
         return X, y
 
+    def _prepare_features_combined(
+        self,
+        train_df: pd.DataFrame,
+        val_df: pd.DataFrame,
+        test_df: pd.DataFrame,
+    ) -> Tuple[Tuple[pd.DataFrame, pd.Series], ...]:
+        """
+        Engineer features for all splits in one transform, then slice them apart.
+
+        The splits are concatenated with a _split tag, so weather, events and
+        reports are joined once and the per-call overhead of transform is paid
+        once. Rolling and lag features of validation/test rows can now draw on
+        the rows preceding them in time.
+
+        Returns:
+            (X, y) tuples for train, validation and test
+        """
+        splits = [train_df, val_df, test_df]
+        combined = pd.concat(splits, ignore_index=True)
+        combined["_split"] = np.repeat(
+            np.arange(len(splits), dtype=np.int8), [len(df) for df in splits]
+        )
+
+        X, y = self._prepare_features(combined, split="all")
+        tags = X["_split"].to_numpy()
+        X = X.drop(columns="_split")
+
+        return tuple(
+            (X[tags == i].reset_index(drop=True), y[tags == i].reset_index(drop=True))
+            for i in range(len(splits))
+        )
+
+    def _feature_cache_path(self, split: str) -> Path:
+        """Parquet file holding the engineered features of one split."""
+        return self.config.model_dir / ".feat_cache" / f"{self._feature_cache_key}_{split}.parquet"
+
+    def _write_feature_cache(self, path: Path, df: pd.DataFrame) -> None:
+        """Write engineered features to the cache (atomically, so readers never see partial files)."""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache features: {e}")
+
     def _train_model(
         self,
         X_train: pd.DataFrame,
@@ -168,21 +304,18 @@ class Trainer:
         """Train the selected model type."""
         model_type = self.config.model.model_type
 
-        if model_type == "ensemble":
-            model = self._create_ensemble_model()
-        elif model_type == "tft":
-            model = self._create_tft_model()
-        elif model_type == "lightgbm":
-            model = self._create_lgb_model()
-        else:
+        create_model = self.MODEL_REGISTRY.get(model_type)
+        if create_model is None:
             raise ValueError(f"Unknown model type: {model_type}")
 
+        model = create_model(self)
         model.fit(X_train, y_train, validation_data=validation_data)
         return model
 
-    def _create_ensemble_model(self) -> EnsembleModel:
-        """Create ensemble model with configuration."""
-        tft_config = TFTConfig(
+    @functools.cached_property
+    def _tft_cfg(self) -> TFTConfig:
+        """TFT configuration, built once from the model settings."""
+        return TFTConfig(
             hidden_size=self.config.model.tft_hidden_size,
             lstm_layers=self.config.model.tft_lstm_layers,
             attention_heads=self.config.model.tft_attention_heads,
@@ -192,9 +325,14 @@ class Trainer:
             learning_rate=self.config.model.tft_learning_rate,
             max_epochs=self.config.model.tft_max_epochs,
             quantiles=self.config.model.quantiles,
+            strategy=self.config.model.tft_strategy,
+            tf32=self.config.model.tft_tf32,
         )
 
-        lgb_config = LightGBMConfig(
+    @functools.cached_property
+    def _lgb_cfg(self) -> LightGBMConfig:
+        """LightGBM configuration, built once from the model settings."""
+        return LightGBMConfig(
             num_leaves=self.config.model.lgb_num_leaves,
             learning_rate=self.config.model.lgb_learning_rate,
             n_estimators=self.config.model.lgb_n_estimators,
@@ -203,41 +341,31 @@ class Trainer:
             quantiles=self.config.model.quantiles,
         )
 
+    def _create_ensemble_model(self) -> EnsembleModel:
+        """Create ensemble model with configuration."""
         ensemble_config = EnsembleConfig(
-            tft_config=tft_config,
-            lgb_config=lgb_config,
+            tft_config=self._tft_cfg,
+            lgb_config=self._lgb_cfg,
             strategy=self.config.model.ensemble_strategy,
             n_folds=self.config.model.ensemble_n_folds,
+            n_jobs=self.config.model.ensemble_n_jobs,
         )
-
         return EnsembleModel(config=ensemble_config)
 
     def _create_tft_model(self) -> TemporalFusionTransformerModel:
         """Create TFT model with configuration."""
-        config = TFTConfig(
-            hidden_size=self.config.model.tft_hidden_size,
-            lstm_layers=self.config.model.tft_lstm_layers,
-            attention_heads=self.config.model.tft_attention_heads,
-            dropout=self.config.model.tft_dropout,
-            encoder_length=self.config.model.tft_encoder_length,
-            decoder_length=self.config.model.tft_decoder_length,
-            learning_rate=self.config.model.tft_learning_rate,
-            max_epochs=self.config.model.tft_max_epochs,
-            quantiles=self.config.model.quantiles,
-        )
-        return TemporalFusionTransformerModel(config=config)
+        return TemporalFusionTransformerModel(config=self._tft_cfg)
 
     def _create_lgb_model(self) -> LightGBMModel:
         """Create LightGBM model with configuration."""
-        config = LightGBMConfig(
-            num_leaves=self.config.model.lgb_num_leaves,
-            learning_rate=self.config.model.lgb_learning_rate,
-            n_estimators=self.config.model.lgb_n_estimators,
-            early_stopping_rounds=self.config.model.lgb_early_stopping_rounds,
-            feature_fraction=self.config.model.lgb_feature_fraction,
-            quantiles=self.config.model.quantiles,
-        )
-        return LightGBMModel(config=config)
+        return LightGBMModel(config=self._lgb_cfg)
+
+    # Model type -> factory method
+    MODEL_REGISTRY = {
+        "tft": _create_tft_model,
+        "lightgbm": _create_lgb_model,
+        "ensemble": _create_ensemble_model,
+    }
 
     def _evaluate_model(
         self,
@@ -261,51 +389,100 @@ class Trainer:
 
     def _save_model(self, model) -> Path:
         """Save model artifacts to disk."""
+        # Name and paths are derived once, so every step sees the same timestamp
+        model_dir = self.config.model_dir
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        model_name = f"{self.config.model.model_type}_{timestamp}"
-        model_path = self.config.model_dir / model_name
+        model_path = model_dir / f"{self.config.model.model_type}_{timestamp}"
+        latest_path = model_dir / "latest"
+        tmp_link = model_dir / f".latest.{os.getpid()}"
 
         model.save(model_path)
 
-        # Also save as "latest" for easy access
-        latest_path = self.config.model_dir / "latest"
-        if latest_path.exists():
-            import shutil
+        # Point "latest" at the new artifacts: a symlink created under a temp
+        # name and renamed over the old one, so "latest" is never missing and
+        # the model is only written once
+        if latest_path.is_dir() and not latest_path.is_symlink():
+            # Directory left by older runs, which saved a second copy
             shutil.rmtree(latest_path)
-        model.save(latest_path)
+
+        if tmp_link.is_symlink() or tmp_link.exists():
+            tmp_link.unlink()
+        tmp_link.symlink_to(model_path.name)
+        os.replace(tmp_link, latest_path)
 
         return model_path
 
-    def _log_feature_importance(self, importance: pd.Series) -> None:
-        """Log feature importance to MLflow."""
-        # Save as artifact
-        importance_path = self.config.logs_dir / "feature_importance.csv"
-        importance.to_csv(importance_path)
-        mlflow.log_artifact(str(importance_path))
+    def _log_artifact_async(self, path: Path) -> None:
+        """Upload an artifact to the active MLflow run on the I/O pool."""
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mlflow-upload")
+            atexit.register(self.wait_for_uploads)
 
-        # Log top features as metrics
-        for i, (feature, score) in enumerate(importance.head(10).items()):
-            mlflow.log_metric(f"feature_importance_{i}_{feature}", score)
+        # The active run is thread-local, so pass its id to the client explicitly
+        run_id = mlflow.active_run().info.run_id
+        self._pending_uploads.append(
+            self._io_pool.submit(self._mlflow_client.log_artifact, run_id, str(path))
+        )
 
-    def _flatten_config(self) -> Dict[str, Any]:
-        """Flatten config for MLflow logging."""
-        config_dict = self.config.to_dict()
+    def wait_for_uploads(self) -> None:
+        """
+        Block until all pending MLflow artifact uploads have finished.
+
+        Also shuts the upload pool down and drops its exit hook, so the
+        trainer can be garbage collected; a later upload starts a new pool.
+        """
+        if self._io_pool is None:
+            return
+
+        pending, self._pending_uploads = self._pending_uploads, []
+        if pending:
+            logger.info(f"Waiting for {len(pending)} artifact upload(s)...")
+            wait(pending)
+            for future in pending:
+                if future.exception() is not None:
+                    logger.error(f"Artifact upload failed: {future.exception()}")
+
+        self._io_pool.shutdown(wait=True)
+        self._io_pool = None
+        atexit.unregister(self.wait_for_uploads)
+
+    def _log_feature_importance(self, importance: pd.Series) -> None:
+        """Log feature importance to MLflow."""
+        # Save as artifacts: full scores as Parquet, top features as readable CSV
+        importance_path = self.config.logs_dir / "feature_importance.parquet"
+        importance.to_frame("importance").to_parquet(importance_path, compression="zstd")
+        self._log_artifact_async(importance_path)
+
+        top_path = self.config.logs_dir / "feature_importance_top100.csv"
+        importance.head(100).to_csv(top_path)
+        self._log_artifact_async(top_path)
+
+        # Log top features as metrics in one batch
+        mlflow.log_metrics({
+            f"feature_importance_{i}_{feature}": float(score)
+            for i, (feature, score) in enumerate(importance.head(10).items())
+        })
+
+    def _flatten_config(self, config_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten a config dictionary (from TrainingConfig.to_dict) for MLflow logging."""
         flat = {}
 
-        def _flatten(d, prefix=""):
+        # Walk nested sections with an explicit stack of key paths; each leaf
+        # key is joined once
+        stack = [((), config_dict)]
+        while stack:
+            path, d = stack.pop()
             for k, v in d.items():
-                key = f"{prefix}{k}" if prefix else k
+                key_path = path + (k,)
                 if isinstance(v, dict):
-                    _flatten(v, f"{key}_")
+                    stack.append((key_path, v))
                 elif isinstance(v, list):
-                    flat[key] = str(v)
+                    flat["_".join(key_path)] = str(v)
                 else:
-                    flat[key] = v
+                    flat["_".join(key_path)] = v
 
-        _flatten(config_dict)
         return flat
 
-
 def train_model(
     config_path: Optional[str] = None,
     model_type: Optional[str] = None,
@@ -329,6 +506,70 @@ def train_model(
     return trainer.run()
 
 
+def _frame_fingerprint(df: Optional[pd.DataFrame]) -> Optional[Tuple[Tuple[int, int], int]]:
+    """Shape and summed row hashes of a frame (None for a missing frame)."""
+    if df is None:
+        return None
+    return df.shape, int(pd.util.hash_pandas_object(df, index=False).sum())
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """Compress a rotated log file (runs on the log listener thread)."""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _setup_logging(logs_dir: Path) -> logging.handlers.QueueListener:
+    """
+    Route root logging through a queue to the console and a rotating log file.
+
+    Callers only enqueue records; formatting, disk writes and gzip rotation
+    happen on the listener thread. The returned listener is already started.
+    """
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    # One file per process under DDP, since rotation is not multi-process safe
+    rank = int(os.environ.get("RANK", 0))
+    log_name = "train.log" if rank == 0 else f"train.rank{rank}.log"
+
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    file_handler = logging.handlers.RotatingFileHandler(
+        logs_dir / log_name, maxBytes=10_000_000, backupCount=5
+    )
+    file_handler.namer = lambda name: f"{name}.gz"
+    file_handler.rotator = _gzip_rotator
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler)
+    listener.start()
+    return listener
+
+
+def _log_blas_config() -> None:
+    """Log which BLAS implementation NumPy is linked against."""
+    try:
+        blas = np.show_config(mode="dicts")["Build Dependencies"]["blas"]
+    except (TypeError, KeyError):
+        # NumPy < 1.25 can only print its build configuration
+        np.show_config()
+        return
+
+    logger.info(
+        f"NumPy BLAS: {blas.get('name')} {blas.get('version')} "
+        f"(MKL_NUM_THREADS={os.environ.get('MKL_NUM_THREADS')})"
+    )
+
+
 def main():
     """Command-line interface for training."""
     parser = argparse.ArgumentParser(
@@ -369,20 +610,44 @@ def main():
     if args.run_name:
         config.training.run_name = args.run_name
 
+    # An explicit MKL thread count is inherited by torchrun and joblib workers
+    # (and takes precedence over joblib's per-worker cap, so it is opt-in)
+    if config.training.blas_threads is not None:
+        os.environ["MKL_NUM_THREADS"] = str(config.training.blas_threads)
+
     # Validate config
     errors = config.validate()
     if errors:
         logger.error(f"Configuration errors: {errors}")
         sys.exit(1)
 
+    # Multi-GPU TFT training: relaunch this command under torchrun with one
+    # process per device on this node
+    uses_tft = config.model.model_type in ("tft", "ensemble")
+    if uses_tft and config.model.tft_devices > 1 and "LOCAL_RANK" not in os.environ:
+        os.execvp("torchrun", [
+            "torchrun",
+            f"--nproc_per_node={config.model.tft_devices}",
+            "-m", "ml.training.train",
+            *sys.argv[1:],
+        ])
+
     # Run training
+    log_listener = _setup_logging(config.logs_dir)
     try:
-        results = Trainer(config).run()
+        _log_blas_config()
+        trainer = Trainer(config)
+        results = trainer.run()
         logger.info(f"Training completed. Model saved to: {results['model_path']}")
         logger.info(f"Final metrics: {results['metrics']}")
+
+        # Flush uploads while the log listener can still record failures
+        trainer.wait_for_uploads()
     except Exception as e:
         logger.exception(f"Training failed: {e}")
         sys.exit(1)
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
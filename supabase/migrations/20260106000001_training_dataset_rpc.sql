@@ -0,0 +1,58 @@
+-- Migration: Training Dataset RPC
+-- Description: Return all ML training sources for a date window in one round trip
+
+-- ============================================
+-- FUNCTION: Training dataset for the ML pipeline
+-- Mirrors the per-table queries issued by ml/training/data_loader.py
+-- so either path yields the same rows in the same order
+-- ============================================
+CREATE OR REPLACE FUNCTION training_dataset(
+  p_start TIMESTAMPTZ,
+  p_end TIMESTAMPTZ,
+  p_lot_ids TEXT[] DEFAULT NULL,
+  p_include_lots TEXT[] DEFAULT NULL,
+  p_exclude_lots TEXT[] DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_occupancy_lots TEXT[] := COALESCE(p_lot_ids, p_include_lots);
+BEGIN
+  RETURN jsonb_build_object(
+    'occupancy', COALESCE((
+      SELECT jsonb_agg(o ORDER BY o."timestamp", o.lot_id)
+      FROM (
+        SELECT "timestamp", lot_id, occupancy_percent, total_spots, available_spots
+        FROM parking_occupancy
+        WHERE "timestamp" >= p_start AND "timestamp" <= p_end
+          AND (v_occupancy_lots IS NULL OR lot_id = ANY(v_occupancy_lots))
+          AND (p_exclude_lots IS NULL OR lot_id <> ALL(p_exclude_lots))
+      ) o
+    ), '[]'::jsonb),
+    'weather', COALESCE((
+      SELECT jsonb_agg(to_jsonb(w) - 'id' ORDER BY w."timestamp", w.id)
+      FROM (
+        SELECT id, "timestamp", temperature, precipitation, wind_speed, humidity, conditions
+        FROM weather_data
+        WHERE "timestamp" >= p_start AND "timestamp" <= p_end
+      ) w
+    ), '[]'::jsonb),
+    'events', COALESCE((
+      SELECT jsonb_agg(e ORDER BY e."date", e.name)
+      FROM (
+        SELECT "date", event_type, name, expected_attendance, venue, start_time, end_time
+        FROM events
+        WHERE "date" >= p_start::DATE AND "date" <= p_end::DATE
+      ) e
+    ), '[]'::jsonb),
+    'reports', COALESCE((
+      SELECT jsonb_agg(r ORDER BY r."timestamp", r.lot_id)
+      FROM (
+        SELECT "timestamp", lot_id, reported_status
+        FROM parking_reports
+        WHERE "timestamp" >= p_start AND "timestamp" <= p_end
+          AND (p_lot_ids IS NULL OR lot_id = ANY(p_lot_ids))
+      ) r
+    ), '[]'::jsonb)
+  );
+END;
+$$ LANGUAGE plpgsql STABLE;